@@ -0,0 +1,92 @@
+"""
+Lazily constructed, shared API clients.
+
+Importing the cohere, elevenlabs, google.generativeai and twilio SDKs costs
+hundreds of milliseconds, and building their clients fails outright when a key
+is missing. Every client here is created on first use and then cached for
+the life of the process, so a workflow only pays for the SDKs it actually
+calls and a missing key only breaks the workflow that needs it.
+"""
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_MODEL = "gemini-1.5-flash"
+
+_clients = {}
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _cached(name, factory):
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    # One lock per client so a slow SDK import does not block the others
+    with _locks_lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    with lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = factory()
+        return client
+
+
+def _require(variable):
+    value = os.getenv(variable)
+    if not value:
+        raise ValueError(f"{variable} not found in environment variables")
+    return value
+
+
+def get_cohere_client():
+    """Shared Cohere V2 client"""
+
+    def create():
+        import cohere
+
+        return cohere.ClientV2(api_key=_require("COHERE_API_KEY"))
+
+    return _cached("cohere", create)
+
+
+def get_elevenlabs_client():
+    """Shared ElevenLabs client"""
+
+    def create():
+        from elevenlabs.client import ElevenLabs
+
+        return ElevenLabs(api_key=_require("ELEVENLABS_API_KEY"))
+
+    return _cached("elevenlabs", create)
+
+
+def get_gemini_model(model_name=GEMINI_MODEL):
+    """Shared Gemini model; genai.configure runs once, on the first call"""
+
+    def create():
+        import google.generativeai as genai
+
+        genai.configure(api_key=_require("GEMINI_API_KEY"))
+        return genai.GenerativeModel(model_name)
+
+    return _cached(f"gemini:{model_name}", create)
+
+
+def get_twilio_client():
+    """Shared Twilio REST client, sending over the pooled keep-alive session"""
+
+    def create():
+        from twilio.rest import Client
+
+        from http_pool import twilio_http_client
+
+        return Client(
+            _require("TWILIO_ACCOUNT_SID"), _require("TWILIO_AUTH_TOKEN"), http_client=twilio_http_client()
+        )
+
+    return _cached("twilio", create)
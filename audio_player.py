@@ -0,0 +1,183 @@
+"""
+Pluggable local audio players for text-to-speech playback.
+
+Players that can decode MP3 from stdin (mpv, ffplay, mpg123) support
+streaming: TTS chunks are piped in as they arrive from the API, so playback
+starts on the first chunk instead of after the whole file is synthesized.
+afplay (macOS) can only play files and is used as the non-streaming fallback.
+
+Set AUDIO_PLAYER to force a player by name; otherwise the first installed one
+in PLAYER_PREFERENCE is used.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+
+_active = set()
+_active_lock = threading.Lock()
+
+
+class Playback:
+    """A running player process"""
+
+    def __init__(self, process, description):
+        self.process = process
+        self.description = description
+        # Lets a speech worker stop only the playbacks it started
+        self.thread = threading.current_thread()
+        with _active_lock:
+            _active.add(self)
+
+    def write(self, chunk):
+        """Feed an audio chunk to a streaming player"""
+        self.process.stdin.write(chunk)
+        self.process.stdin.flush()
+
+    def finish(self):
+        """Signal end of stream and wait for playback to complete"""
+        if self.process.stdin:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        return self.wait()
+
+    def wait(self):
+        try:
+            returncode = self.process.wait()
+        finally:
+            with _active_lock:
+                _active.discard(self)
+        if returncode not in (0, -15):
+            raise subprocess.CalledProcessError(returncode, self.description)
+        return returncode
+
+    def stop(self):
+        """Interrupt playback immediately"""
+        if self.process.poll() is None:
+            self.process.terminate()
+
+    @property
+    def running(self):
+        return self.process.poll() is None
+
+
+class AudioPlayer:
+    """Base class: a command line player that can play a file and optionally stdin"""
+
+    name = "base"
+    executable = None
+    supports_streaming = False
+
+    def file_command(self, path):
+        raise NotImplementedError
+
+    def stream_command(self):
+        raise NotImplementedError
+
+    def available(self):
+        return shutil.which(self.executable) is not None
+
+    def play_file(self, path):
+        """Start playing an audio file and return the Playback"""
+        command = self.file_command(str(path))
+        return Playback(subprocess.Popen(command), " ".join(command))
+
+    def open_stream(self):
+        """Start a player reading MP3 from stdin and return the Playback"""
+        if not self.supports_streaming:
+            raise RuntimeError(f"{self.name} cannot play from a stream")
+        command = self.stream_command()
+        process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return Playback(process, " ".join(command))
+
+
+class AfplayPlayer(AudioPlayer):
+    name = "afplay"
+    executable = "afplay"
+
+    def file_command(self, path):
+        return ["afplay", path]
+
+
+class MpvPlayer(AudioPlayer):
+    name = "mpv"
+    executable = "mpv"
+    supports_streaming = True
+
+    def file_command(self, path):
+        return ["mpv", "--no-video", "--really-quiet", path]
+
+    def stream_command(self):
+        return ["mpv", "--no-video", "--really-quiet", "--cache=no", "-"]
+
+
+class FfplayPlayer(AudioPlayer):
+    name = "ffplay"
+    executable = "ffplay"
+    supports_streaming = True
+
+    def file_command(self, path):
+        return ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", path]
+
+    def stream_command(self):
+        return ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", "-fflags", "nobuffer", "-i", "-"]
+
+
+class Mpg123Player(AudioPlayer):
+    name = "mpg123"
+    executable = "mpg123"
+    supports_streaming = True
+
+    def file_command(self, path):
+        return ["mpg123", "-q", path]
+
+    def stream_command(self):
+        return ["mpg123", "-q", "-"]
+
+
+def stop_all(thread=None):
+    """
+    Interrupt running playbacks (used to preempt speech for emergencies)
+
+    Args:
+        thread (threading.Thread): Only stop playbacks started by this thread (None = all)
+    """
+    with _active_lock:
+        playbacks = [playback for playback in _active if thread is None or playback.thread is thread]
+    for playback in playbacks:
+        playback.stop()
+    return len(playbacks)
+
+
+PLAYERS = {player.name: player for player in (MpvPlayer, FfplayPlayer, Mpg123Player, AfplayPlayer)}
+# Streaming-capable players first; afplay only plays files
+PLAYER_PREFERENCE = ("mpv", "ffplay", "mpg123", "afplay")
+
+_player = None
+
+
+def get_player():
+    """Return the configured or first available audio player (cached)"""
+    global _player
+    if _player is not None:
+        return _player
+
+    requested = os.getenv("AUDIO_PLAYER")
+    if requested:
+        if requested not in PLAYERS:
+            raise ValueError(f"Unknown AUDIO_PLAYER: {requested}. Available: {list(PLAYERS)}")
+        _player = PLAYERS[requested]()
+        return _player
+
+    for name in PLAYER_PREFERENCE:
+        player = PLAYERS[name]()
+        if player.available():
+            _player = player
+            return _player
+
+    raise RuntimeError("No audio player found. Install mpv, ffmpeg (ffplay) or mpg123")
@@ -0,0 +1,56 @@
+"""
+Long-lived capture service shared by the workflows.
+
+Opening mss and allocating conversion buffers on every screenshot adds
+latency right when a workflow fires, which hurts most on the emergency path.
+This module keeps one open FrameSource per thread (mss handles cannot be
+shared across threads) and reuses it for every capture.
+"""
+
+import atexit
+import threading
+
+from frame_source import open_frame_source
+
+_local = threading.local()
+_sources = []
+_sources_lock = threading.Lock()
+
+
+def get_frame_source():
+    """Return this thread's persistent frame source, opening it on first use"""
+    source = getattr(_local, "source", None)
+    if source is None:
+        source = open_frame_source()
+        _local.source = source
+        with _sources_lock:
+            _sources.append(source)
+    return source
+
+
+def capture_frame():
+    """
+    Capture one BGR frame from the shared source.
+
+    The returned array is the source's reusable buffer: it stays valid until
+    the next capture on the same thread, so copy it if you need to keep it.
+    """
+    return get_frame_source().read()
+
+
+def warm_up():
+    """Open the capture handle ahead of time so the first capture is fast"""
+    get_frame_source()
+
+
+def close_capture_service():
+    """Close every source opened by the service"""
+    with _sources_lock:
+        sources = list(_sources)
+        _sources.clear()
+    for source in sources:
+        source.close()
+    _local.__dict__.pop("source", None)
+
+
+atexit.register(close_capture_service)
@@ -1,93 +1,509 @@
-import cv2
-import numpy as np
-from ultralytics import YOLO
-from mss import mss
+import argparse
+import sys
+import threading
 import time
+from collections import deque
 
-# Load YOLOv8 Nano model
-model = YOLO("yolov8n.pt")
+import cv2
 
-# Set up screen capture
-sct = mss()
-monitor = {"top": 140, "left": 25, "width": 400, "height": 600}  # Facebook livestream coordinates
+from detection_sink import FORMATS, DetectionSink
+from detector_backends import BACKENDS, load_detector
+from motion_gate import MotionGate
+from overlay import OverlayRenderer, draw_hud
+from tracker import BoxTracker
+from frame_source import (
+    DEFAULT_REGION,
+    MssFrameSource,
+    monitor_region,
+    open_frame_source,
+    parse_region,
+    tile_region,
+)
 
-# Frame skipping: process every nth frame for detection
-frame_skip = 2  # Adjust this (1 = no skipping, 2 = every 2nd frame, etc.)
-count = 0
+MODEL_PATH = "yolov8n.pt"
+CONF_THRESHOLD = 0.4
+WINDOW_NAME = "YOLOv8 Live Detection"
 
-# Variable to store the last annotated frame
-last_annotated_frame = None
 
-print("Starting livestream detection. Press 'q' to quit.")
+class LatestFrameQueue:
+    """
+    Bounded hand-off between pipeline stages where the newest item wins.
 
-prev_time = time.time()
+    put() never blocks: when the queue is full the oldest item is discarded,
+    so a slow consumer always sees the most recent frame instead of working
+    through a backlog of stale ones.
+    """
 
-while True:
-    # Timing for capture
-    capture_start = time.time()
-    screenshot = sct.grab(monitor)
-    frame = np.array(screenshot)
-    frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-    capture_time = time.time() - capture_start
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
 
-    # Run detection only every 'frame_skip' frames
-    if count % frame_skip == 0:
-        inference_start = time.time()
-        results = model(frame, conf=0.4, device="mps")
-        inference_time = time.time() - inference_start
-        annotated_frame = results[0].plot()
-        last_annotated_frame = annotated_frame  # Update the last annotated frame
-    else:
-        # Use the last annotated frame if available, otherwise raw frame
-        annotated_frame = (
-            last_annotated_frame if last_annotated_frame is not None else frame
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the next item, or None if nothing arrived within timeout"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+
+class StageTimings:
+    """Exponential moving average of per-stage durations in seconds"""
+
+    def __init__(self, smoothing=0.9):
+        self.smoothing = smoothing
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            previous = self._values.get(stage)
+            if previous is None:
+                self._values[stage] = seconds
+            else:
+                self._values[stage] = (
+                    self.smoothing * previous + (1 - self.smoothing) * seconds
+                )
+
+    def get(self, stage):
+        with self._lock:
+            return self._values.get(stage, 0.0)
+
+    def summary(self, stages):
+        return ", ".join(f"{stage.capitalize()}: {self.get(stage):.3f}s" for stage in stages)
+
+
+def hud_text(fps, timings, stages):
+    """One-line HUD: FPS followed by each stage time in milliseconds"""
+    parts = [f"FPS {int(fps)}"]
+    parts += [f"{stage[:3]} {timings.get(stage) * 1000:.0f}ms" for stage in stages]
+    return " | ".join(parts)
+
+
+def run_sequential(detector, source_spec=None, gate=None, tracker=None):
+    """
+    Capture, detect and display one frame after another on the main thread.
+
+    The motion gate decides per frame whether the scene changed enough (or the
+    last detection is stale enough) to run the detector again. On the frames
+    in between, the tracker propagates the last detections to the current
+    frame, so boxes follow moving objects and keep stable track IDs.
+    """
+    source = open_frame_source(source_spec)
+    gate = gate or MotionGate()
+    tracker = tracker or BoxTracker()
+    renderer = OverlayRenderer(detector.names)
+    timings = StageTimings()
+    stages = ("capture", "inference", "tracking")
+    prev_time = time.time()
+
+    while True:
+        capture_start = time.time()
+        frame = source.read()
+        if frame is None:
+            break
+        timings.record("capture", time.time() - capture_start)
+
+        # Run detection only when the scene changed or the last result went stale
+        if gate.should_infer(frame, now=capture_start):
+            inference_start = time.time()
+            detections = detector.detect(frame)
+            timings.record("inference", time.time() - inference_start)
+            tracking_start = time.time()
+            tracked = tracker.update(*detections, now=capture_start)
+        else:
+            tracking_start = time.time()
+            tracked = tracker.visible(now=capture_start)
+        timings.record("tracking", time.time() - tracking_start)
+
+        # Draw straight onto the captured frame; the source overwrites it on the next read
+        annotated_frame = renderer.draw_tracks(frame, tracked)
+
+        curr_time = time.time()
+        fps = 1 / max(curr_time - prev_time, 1e-6)
+        prev_time = curr_time
+
+        draw_hud(annotated_frame, hud_text(fps, timings, stages))
+        cv2.imshow(WINDOW_NAME, annotated_frame)
+        print(
+            f"{timings.summary(stages)}, FPS: {fps:.1f}, Objects: {len(tracked)}, "
+            f"Motion: {gate.score:.1f}, {gate.summary()}"
         )
 
-    # Calculate FPS
-    curr_time = time.time()
-    fps = 1 / (curr_time - prev_time)
-    prev_time = curr_time
-
-    # Add FPS and timing info to the frame
-    cv2.putText(
-        annotated_frame,
-        f"FPS: {int(fps)}",
-        (10, 30),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        1,
-        (0, 255, 0),
-        2,
-    )
-    cv2.putText(
-        annotated_frame,
-        f"Capture: {capture_time:.3f}s",
-        (10, 60),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        0.7,
-        (255, 0, 0),
-        2,
-    )
-    cv2.putText(
-        annotated_frame,
-        f"Inference: {inference_time if 'inference_time' in locals() else 0:.3f}s",
-        (10, 90),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        0.7,
-        (255, 0, 0),
-        2,
-    )
-
-    # Show the frame
-    cv2.imshow("YOLOv8 Live Detection", annotated_frame)
-
-    # Print timing logs
-    print(
-        f"Capture: {capture_time:.3f}s, Inference: {inference_time if 'inference_time' in locals() else 0:.3f}s, FPS: {fps:.1f}"
-    )
-
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-    count += 1
-
-cv2.destroyAllWindows()
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
+
+    source.close()
+    print(f"Motion gate: {gate.summary()}")
+
+
+def run_pipelined(detector, source_spec=None):
+    """
+    Run capture, inference and display as overlapping stages.
+
+    A capture thread keeps grabbing the screen and an inference thread always
+    works on the newest captured frame, while the main thread renders results
+    (cv2.imshow must stay on the main thread on macOS). Stages are connected
+    by LatestFrameQueue, so stale frames are dropped instead of queueing up
+    and end-to-end latency stays close to a single inference.
+    """
+    renderer = OverlayRenderer(detector.names)
+    timings = StageTimings()
+    stages = ("capture", "inference", "render", "latency")
+    captured = LatestFrameQueue(maxsize=1)
+    detected = LatestFrameQueue(maxsize=1)
+    stop_event = threading.Event()
+    capture_done = threading.Event()
+
+    def capture_loop():
+        # mss handles are not safe to share across threads, so open the source here
+        with open_frame_source(source_spec) as source:
+            while not stop_event.is_set():
+                capture_start = time.time()
+                frame = source.read()
+                if frame is None:
+                    break
+                timings.record("capture", time.time() - capture_start)
+                # The source reuses its buffer, so hand the next stage a copy
+                captured.put((capture_start, frame.copy()))
+        capture_done.set()
+
+    def inference_loop():
+        while not stop_event.is_set():
+            item = captured.get(timeout=0.1)
+            if item is None:
+                if capture_done.is_set():
+                    break
+                continue
+            captured_at, frame = item
+            inference_start = time.time()
+            detections = detector.detect(frame)
+            timings.record("inference", time.time() - inference_start)
+            detected.put((captured_at, frame, detections))
+
+    workers = [
+        threading.Thread(target=capture_loop, name="capture", daemon=True),
+        threading.Thread(target=inference_loop, name="inference", daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    prev_time = time.time()
+    try:
+        while True:
+            item = detected.get(timeout=0.1)
+            if item is None:
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+                if capture_done.is_set() and not workers[1].is_alive():
+                    break
+                continue
+            captured_at, frame, detections = item
+
+            # The frame is this stage's own copy, so draw on it in place
+            render_start = time.time()
+            annotated_frame = renderer.draw_detections(frame, detections)
+            timings.record("render", time.time() - render_start)
+
+            curr_time = time.time()
+            fps = 1 / max(curr_time - prev_time, 1e-6)
+            prev_time = curr_time
+            timings.record("latency", curr_time - captured_at)
+
+            draw_hud(annotated_frame, hud_text(fps, timings, stages))
+            cv2.imshow(WINDOW_NAME, annotated_frame)
+            print(
+                f"{timings.summary(stages)}, FPS: {fps:.1f}, "
+                f"Dropped: {captured.dropped} captured / {detected.dropped} detected"
+            )
+
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=2)
+
+
+def run_batched(detector, regions=None, source_spec=None, batch_size=4, display=True):
+    """
+    Run one batched detector call per step over several frames.
+
+    With regions, each step grabs every screen region once and the batch
+    holds one frame per region. Without regions, the batch holds batch_size
+    consecutive frames from source_spec. Batching amortizes the per-call
+    overhead that dominates nano-model inference on CPU (the torch backend
+    sends the whole batch through one model([...]) call). Per-region results
+    are routed back to their own window and throughput is reported in
+    frames/sec per region.
+    """
+    if regions:
+        sources = [MssFrameSource(region) for region in regions]
+        labels = [f"{r['width']}x{r['height']}@{r['left']},{r['top']}" for r in regions]
+    else:
+        sources = [open_frame_source(source_spec)]
+        labels = [f"frame {index}" for index in range(batch_size)]
+
+    renderer = OverlayRenderer(detector.names)
+    timings = StageTimings()
+    stages = ("capture", "inference", "render")
+    processed = [0] * len(labels)
+    start_time = time.time()
+    prev_time = start_time
+
+    try:
+        while True:
+            capture_start = time.time()
+            if regions:
+                # Each region has its own buffer, so the frames can be batched as-is
+                frames = [source.read() for source in sources]
+            else:
+                # Consecutive frames share one buffer, so keep copies
+                frames = []
+                for _ in range(batch_size):
+                    frame = sources[0].read()
+                    if frame is None:
+                        break
+                    frames.append(frame.copy())
+            if not frames or any(frame is None for frame in frames):
+                break
+            timings.record("capture", time.time() - capture_start)
+
+            inference_start = time.time()
+            results = detector.detect_batch(frames)
+            timings.record("inference", time.time() - inference_start)
+
+            render_start = time.time()
+            curr_time = time.time()
+            fps = len(frames) / max(curr_time - prev_time, 1e-6)
+            prev_time = curr_time
+            for index, detections in enumerate(results):
+                processed[index] += 1
+                if display:
+                    annotated_frame = renderer.draw_detections(frames[index], detections)
+                    draw_hud(annotated_frame, hud_text(fps, timings, stages))
+                    cv2.imshow(f"{WINDOW_NAME} [{labels[index]}]", annotated_frame)
+            timings.record("render", time.time() - render_start)
+
+            elapsed = max(curr_time - start_time, 1e-6)
+            per_region = ", ".join(
+                f"{labels[index]}: {processed[index] / elapsed:.1f} FPS"
+                for index in range(len(results))
+            )
+            print(f"Batch of {len(frames)} - {timings.summary(stages)} | {per_region}")
+
+            if display and cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    finally:
+        for source in sources:
+            source.close()
+
+
+def run_headless(detector, sink, source_spec=None, gate=None, tracker=None, report_every=100):
+    """
+    Detect without drawing or display and stream every frame's detections to sink.
+
+    Frames where the motion gate skips inference still get a record with the
+    tracker's propagated boxes (inferred=false). Status goes to stderr so
+    stdout stays a clean data stream.
+    """
+    gate = gate or MotionGate()
+    tracker = tracker or BoxTracker()
+    timings = StageTimings()
+    stages = ("capture", "inference", "tracking", "emit")
+    frame_index = 0
+
+    with open_frame_source(source_spec) as source:
+        while True:
+            capture_start = time.time()
+            frame = source.read()
+            if frame is None:
+                break
+            timings.record("capture", time.time() - capture_start)
+
+            inferred = gate.should_infer(frame, now=capture_start)
+            if inferred:
+                inference_start = time.time()
+                detections = detector.detect(frame)
+                timings.record("inference", time.time() - inference_start)
+                tracking_start = time.time()
+                tracked = tracker.update(*detections, now=capture_start)
+            else:
+                tracking_start = time.time()
+                tracked = tracker.visible(now=capture_start)
+            timings.record("tracking", time.time() - tracking_start)
+
+            emit_start = time.time()
+            sink.write(capture_start, frame_index, inferred, tracked)
+            timings.record("emit", time.time() - emit_start)
+
+            frame_index += 1
+            if frame_index % report_every == 0:
+                print(f"{timings.summary(stages)}, {gate.summary()}", file=sys.stderr)
+
+    print(f"Emitted {sink.frames} frames. Motion gate: {gate.summary()}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live YOLOv8 detection on a screen region")
+    parser.add_argument(
+        "--mode",
+        choices=("sequential", "pipelined", "batched"),
+        default="sequential",
+        help=(
+            "sequential runs every stage in turn; pipelined overlaps capture and inference; "
+            "batched runs several regions or frames through one model call"
+        ),
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=1.0,
+        help="sequential/headless: scene change score (0-100) that triggers detection",
+    )
+    parser.add_argument(
+        "--max-staleness",
+        type=float,
+        default=1.0,
+        help="sequential/headless: rerun detection after this many seconds even without motion",
+    )
+    parser.add_argument(
+        "--track-iou",
+        type=float,
+        default=0.3,
+        help="sequential/headless: minimum IoU to continue a track with a new detection",
+    )
+    parser.add_argument(
+        "--motion-method",
+        choices=("diff", "histogram"),
+        default="diff",
+        help="sequential/headless: downsampled pixel difference or histogram delta",
+    )
+    parser.add_argument(
+        "--source",
+        default=None,
+        help="frame source: screen (default), synthetic[:WxH], an image directory or a video file",
+    )
+    parser.add_argument(
+        "--regions",
+        default=None,
+        help='batched mode: screen regions as "left,top,width,height;left,top,width,height"',
+    )
+    parser.add_argument(
+        "--tile",
+        default=None,
+        help="batched mode: split the capture region (or --monitor) into a ROWSxCOLS grid",
+    )
+    parser.add_argument(
+        "--monitor",
+        type=int,
+        default=None,
+        help="batched mode: tile this whole mss monitor instead of the livestream region",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=4,
+        help="batched mode without regions: consecutive frames per model call",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="torch",
+        help="detector runtime; onnx and openvino exports are cached under models/",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="intra-op thread count for the detector runtime",
+    )
+    parser.add_argument(
+        "--device",
+        default=None,
+        help="torch backend device (default: mps when available, else cpu; cpu in batched mode)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="skip drawing and display; stream detections to --output instead",
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="headless mode: - for stdout, a file path, or unix:/path/to.sock",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="ndjson",
+        help="headless mode: newline-delimited JSON or compact binary records",
+    )
+    args = parser.parse_args()
+    # Keep stdout clean when it carries the detection stream
+    log_file = sys.stderr if args.headless and args.output == "-" else sys.stdout
+
+    # Load YOLOv8 Nano model
+    device = args.device or ("cpu" if args.mode == "batched" else None)
+    detector = load_detector(
+        args.backend,
+        MODEL_PATH,
+        threads=args.threads,
+        device=device,
+        conf=CONF_THRESHOLD,
+        quiet=log_file is sys.stderr,
+    )
+    print(f"Detector backend: {detector.name}", file=log_file)
+
+    gate = MotionGate(
+        threshold=args.motion_threshold,
+        max_staleness=args.max_staleness,
+        method=args.motion_method,
+    )
+    tracker = BoxTracker(iou_threshold=args.track_iou)
+
+    if args.headless:
+        print(f"Starting headless detection -> {args.output} ({args.format})", file=log_file)
+        with DetectionSink(args.output, args.format, detector.names) as sink:
+            try:
+                run_headless(detector, sink, args.source, gate=gate, tracker=tracker)
+            except (KeyboardInterrupt, BrokenPipeError):
+                # Ctrl-C, or the consumer on the other end of stdout went away
+                pass
+        return
+
+    print(f"Starting livestream detection ({args.mode}). Press 'q' to quit.")
+    try:
+        if args.mode == "batched":
+            regions = None
+            if args.regions:
+                regions = [parse_region(text) for text in args.regions.split(";")]
+            elif args.tile:
+                rows, cols = (int(v) for v in args.tile.lower().split("x"))
+                base = monitor_region(args.monitor) if args.monitor is not None else DEFAULT_REGION
+                regions = tile_region(base, rows, cols)
+            run_batched(
+                detector,
+                regions=regions,
+                source_spec=args.source,
+                batch_size=args.batch_size,
+            )
+        elif args.mode == "pipelined":
+            run_pipelined(detector, source_spec=args.source)
+        else:
+            run_sequential(detector, source_spec=args.source, gate=gate, tracker=tracker)
+    finally:
+        cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Structured detection output for headless runs.
+
+Every frame's detections are written as one record to stdout, a file or a
+local Unix socket, so detection can run as a service on display-less
+servers and feed other processes such as the orchestrator.
+
+Formats:
+- ndjson: one JSON object per line
+    {"ts": 1726000000.123, "frame": 42, "inferred": true,
+     "detections": [{"cls": 0, "name": "person", "conf": 0.91,
+                     "bbox": [x1, y1, x2, y2], "track_id": 7}]}
+- binary: a little-endian FRAME_HEADER (timestamp f64, frame u32,
+  inferred u8, count u16) followed by count DETECTION_RECORDs
+  (cls u16, conf f32, x1 y1 x2 y2 f32, track_id u32; 0 = untracked)
+"""
+
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+
+FRAME_HEADER = struct.Struct("<dIBH")
+DETECTION_RECORD = struct.Struct("<Hf4fI")
+FORMATS = ("ndjson", "binary")
+
+
+def encode_ndjson(timestamp, frame_index, inferred, detections, names):
+    record = {
+        "ts": round(timestamp, 6),
+        "frame": frame_index,
+        "inferred": inferred,
+        "detections": [
+            {
+                "cls": cls,
+                "name": names.get(cls, str(cls)),
+                "conf": round(conf, 4),
+                "bbox": [round(v, 1) for v in bbox],
+                "track_id": track_id,
+            }
+            for cls, conf, bbox, track_id in detections
+        ],
+    }
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def encode_binary(timestamp, frame_index, inferred, detections, names):
+    parts = [FRAME_HEADER.pack(timestamp, frame_index, int(inferred), len(detections))]
+    for cls, conf, bbox, track_id in detections:
+        parts.append(DETECTION_RECORD.pack(cls, conf, *bbox, track_id or 0))
+    return b"".join(parts)
+
+
+def decode_binary(stream):
+    """Yield (timestamp, frame, inferred, [(cls, conf, bbox, track_id)]) from a binary stream"""
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        timestamp, frame_index, inferred, count = FRAME_HEADER.unpack(header)
+        body = stream.read(DETECTION_RECORD.size * count)
+        detections = []
+        for offset in range(0, len(body), DETECTION_RECORD.size):
+            cls, conf, x1, y1, x2, y2, track_id = DETECTION_RECORD.unpack_from(body, offset)
+            detections.append((cls, conf, (x1, y1, x2, y2), track_id or None))
+        yield timestamp, frame_index, bool(inferred), detections
+
+
+class DetectionSink:
+    """
+    Encode per-frame detections and write them to a destination.
+
+    Args:
+        destination (str): "-" for stdout, "unix:/path/to.sock" to serve a
+            local Unix socket, or a file path (appended to)
+        fmt (str): "ndjson" or "binary"
+        names (dict): Class id -> class name, included in ndjson records
+    """
+
+    def __init__(self, destination="-", fmt="ndjson", names=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown detection format: {fmt}. Available: {FORMATS}")
+        self.names = names or {}
+        self._encode = encode_ndjson if fmt == "ndjson" else encode_binary
+        self.frames = 0
+
+        if destination == "-":
+            self._output = StreamOutput(sys.stdout.buffer, close=False)
+        elif destination.startswith("unix:"):
+            self._output = UnixSocketOutput(destination[len("unix:"):])
+        else:
+            self._output = StreamOutput(open(destination, "ab"))
+
+    def write(self, timestamp, frame_index, inferred, tracked):
+        """
+        Write one frame.
+
+        Args:
+            tracked (list): (track, box) pairs from BoxTracker, or
+                (cls, conf, bbox, track_id) tuples for untracked detections
+        """
+        detections = []
+        for item in tracked:
+            if len(item) == 2:
+                track, box = item
+                detections.append((track.cls, track.conf, [float(v) for v in box], track.id))
+            else:
+                cls, conf, bbox, track_id = item
+                detections.append((int(cls), float(conf), [float(v) for v in bbox], track_id))
+        self._output.write(self._encode(timestamp, frame_index, inferred, detections, self.names))
+        self.frames += 1
+
+    def close(self):
+        self._output.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class StreamOutput:
+    def __init__(self, stream, close=True):
+        self._stream = stream
+        self._close = close
+
+    def write(self, data):
+        self._stream.write(data)
+        self._stream.flush()
+
+    def close(self):
+        if self._close:
+            self._stream.close()
+
+
+class UnixSocketOutput:
+    """Serve records on a Unix socket; every connected client gets every record"""
+
+    def __init__(self, path, send_timeout=0.5):
+        self.path = path
+        self.send_timeout = send_timeout
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen()
+        self._clients = []
+        self._lock = threading.Lock()
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            client.settimeout(self.send_timeout)
+            with self._lock:
+                self._clients.append(client)
+
+    def write(self, data):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError:
+                # Slow or disconnected consumers are dropped rather than stalling detection
+                with self._lock:
+                    self._clients.remove(client)
+                client.close()
+
+    def close(self):
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,396 @@
+"""
+Detector backends for the live detection pipeline.
+
+The YOLOv8 Nano model can run through three runtimes:
+- torch: the ultralytics PyTorch model (mps when available, otherwise CPU)
+- onnx: an exported ONNX model run by onnxruntime with a configurable thread count
+- openvino: an exported OpenVINO IR model compiled for the CPU
+- onnx-int8: the ONNX export statically quantized to INT8 (see quantize_detector.py)
+
+Exports are cached under MODEL_CACHE_DIR and reused on startup instead of
+being re-exported. Every backend returns the same Detections arrays, so the
+tracker and renderer do not care which runtime produced them. If the
+requested backend cannot be loaded, load_detector() falls back to PyTorch on
+the CPU.
+
+Load and export diagnostics go to stderr so they never mix with a detection
+stream on stdout; load_detector(quiet=True) also silences Ultralytics' own
+stdout logging.
+"""
+
+import ast
+import contextlib
+import logging
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MODEL_PATH = "yolov8n.pt"
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", "models"))
+IMAGE_SIZE = 640
+CONF_THRESHOLD = 0.4
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+BACKENDS = ("torch", "onnx", "openvino", "onnx-int8")
+
+
+class Detections:
+    """Boxes for one frame: xyxy (N, 4) float32, conf (N,) float32 and cls (N,) int"""
+
+    def __init__(self, xyxy=None, conf=None, cls=None):
+        self.xyxy = np.zeros((0, 4), dtype=np.float32) if xyxy is None else xyxy
+        self.conf = np.zeros(0, dtype=np.float32) if conf is None else conf
+        self.cls = np.zeros(0, dtype=np.int64) if cls is None else cls
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    def __iter__(self):
+        # Unpacks as (xyxy, conf, cls), matching BoxTracker.update()
+        return iter((self.xyxy, self.conf, self.cls))
+
+
+class Detector:
+    """Base class: run the model on BGR frames and return Detections"""
+
+    name = "base"
+
+    def __init__(self, conf=CONF_THRESHOLD):
+        self.conf = conf
+        self.names = {}
+
+    def detect(self, frame):
+        raise NotImplementedError
+
+    def detect_batch(self, frames):
+        return [self.detect(frame) for frame in frames]
+
+
+class TorchDetector(Detector):
+    """The ultralytics PyTorch model"""
+
+    name = "torch"
+
+    def __init__(self, model_path=MODEL_PATH, device=None, threads=None, conf=CONF_THRESHOLD):
+        super().__init__(conf)
+        import torch
+        from ultralytics import YOLO
+
+        if threads:
+            torch.set_num_threads(threads)
+        if device is None:
+            device = "mps" if torch.backends.mps.is_available() else "cpu"
+        self.device = device
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+
+    def _convert(self, result):
+        boxes = result.boxes
+        return Detections(
+            boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int64),
+        )
+
+    def detect(self, frame):
+        results = self.model(frame, conf=self.conf, device=self.device, verbose=False)
+        return self._convert(results[0])
+
+    def detect_batch(self, frames):
+        results = self.model(frames, conf=self.conf, device=self.device, verbose=False)
+        return [self._convert(result) for result in results]
+
+
+class ExportedDetector(Detector):
+    """
+    Shared letterbox pre-processing and NMS post-processing for exported models.
+
+    Exported YOLOv8 models take a (1, 3, H, W) float RGB tensor and return
+    (1, 4 + num_classes, num_anchors) raw predictions in cx, cy, w, h form.
+    Models exported with dynamic shapes get the same minimal stride-32
+    letterbox as the PyTorch path (e.g. 448x640 for a 400x600 region) instead
+    of a full square, which keeps their cost comparable.
+    """
+
+    def __init__(self, image_size=IMAGE_SIZE, dynamic=True, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD):
+        super().__init__(conf)
+        self.image_size = image_size
+        self.dynamic = dynamic
+        self.iou = iou
+        self._buffers = {}
+
+    def _letterbox_shape(self, height, width):
+        ratio = min(self.image_size / height, self.image_size / width)
+        new_width, new_height = round(width * ratio), round(height * ratio)
+        if self.dynamic:
+            canvas_width = -(-new_width // 32) * 32
+            canvas_height = -(-new_height // 32) * 32
+        else:
+            canvas_width = canvas_height = self.image_size
+        return ratio, new_width, new_height, canvas_width, canvas_height
+
+    def _preprocess(self, frame):
+        height, width = frame.shape[:2]
+        ratio, new_width, new_height, canvas_width, canvas_height = self._letterbox_shape(
+            height, width
+        )
+        pad_x = (canvas_width - new_width) // 2
+        pad_y = (canvas_height - new_height) // 2
+
+        # Canvas and input tensor are allocated once per frame size and reused
+        key = (height, width)
+        if key not in self._buffers:
+            self._buffers[key] = (
+                np.full((canvas_height, canvas_width, 3), 114, dtype=np.uint8),
+                np.empty((1, 3, canvas_height, canvas_width), dtype=np.float32),
+            )
+        canvas, tensor = self._buffers[key]
+
+        cv2.resize(
+            frame,
+            (new_width, new_height),
+            dst=canvas[pad_y : pad_y + new_height, pad_x : pad_x + new_width],
+            interpolation=cv2.INTER_LINEAR,
+        )
+        # BGR HWC uint8 -> RGB CHW float in [0, 1]
+        np.divide(canvas[..., ::-1].transpose(2, 0, 1), 255.0, out=tensor[0])
+        return tensor, ratio, pad_x, pad_y
+
+    def _postprocess(self, output, ratio, pad_x, pad_y, frame_shape):
+        predictions = output[0].T
+        scores = predictions[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf >= self.conf
+        if not keep.any():
+            return Detections()
+        predictions, cls, conf = predictions[keep], cls[keep], conf[keep]
+
+        cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes_xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes_xywh.tolist(), conf.tolist(), cls.tolist(), self.conf, self.iou
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:MAX_DETECTIONS]
+
+        xyxy = boxes_xywh[indices].copy()
+        xyxy[:, 2:] += xyxy[:, :2]
+        xyxy -= (pad_x, pad_y, pad_x, pad_y)
+        xyxy /= ratio
+        height, width = frame_shape[:2]
+        np.clip(xyxy[:, 0::2], 0, width, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, height, out=xyxy[:, 1::2])
+        return Detections(
+            xyxy.astype(np.float32), conf[indices].astype(np.float32), cls[indices].astype(np.int64)
+        )
+
+    def _run(self, tensor):
+        raise NotImplementedError
+
+    def detect(self, frame):
+        tensor, ratio, pad_x, pad_y = self._preprocess(frame)
+        output = self._run(tensor)
+        return self._postprocess(output, ratio, pad_x, pad_y, frame.shape)
+
+
+class OnnxDetector(ExportedDetector):
+    """An exported ONNX model run through onnxruntime"""
+
+    name = "onnx"
+
+    def __init__(self, model_file, threads=None, name=None, **kwargs):
+        if name:
+            self.name = name
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("onnxruntime is not installed (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        height = model_input.shape[2]
+        dynamic = not isinstance(height, int)
+        super().__init__(image_size=IMAGE_SIZE if dynamic else height, dynamic=dynamic, **kwargs)
+        self._input_name = model_input.name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = ast.literal_eval(metadata["names"])
+
+    def _run(self, tensor):
+        return self.session.run(None, {self._input_name: tensor})[0]
+
+
+class OpenVinoDetector(ExportedDetector):
+    """An exported OpenVINO IR model compiled for the CPU"""
+
+    name = "openvino"
+
+    def __init__(self, model_dir, threads=None, **kwargs):
+        try:
+            import openvino as ov
+        except ImportError as e:
+            raise RuntimeError("openvino is not installed (pip install openvino)") from e
+
+        model_dir = Path(model_dir)
+        core = ov.Core()
+        model = core.read_model(next(model_dir.glob("*.xml")))
+        config = {"INFERENCE_NUM_THREADS": threads} if threads else {}
+        self.compiled = core.compile_model(model, "CPU", config)
+        height = model.input(0).get_partial_shape()[2]
+        dynamic = height.is_dynamic
+        super().__init__(
+            image_size=IMAGE_SIZE if dynamic else height.get_length(), dynamic=dynamic, **kwargs
+        )
+
+        metadata_file = model_dir / "metadata.yaml"
+        if metadata_file.exists():
+            import yaml
+
+            self.names = yaml.safe_load(metadata_file.read_text()).get("names", {})
+
+    def _run(self, tensor):
+        return self.compiled(tensor)[0]
+
+
+def export_model(backend, model_path=MODEL_PATH, image_size=IMAGE_SIZE, cache_dir=MODEL_CACHE_DIR):
+    """
+    Return the cached export of model_path for backend, exporting it on first use.
+
+    ONNX exports are cached as <cache_dir>/<stem>_<size>.onnx and OpenVINO
+    exports as the <cache_dir>/<stem>_<size>_openvino_model/ directory. Both
+    are exported with dynamic input shapes so non-square regions are not
+    padded up to a full square.
+    """
+    cache_dir = Path(cache_dir)
+    stem = Path(model_path).stem
+    if backend == "onnx":
+        cached = cache_dir / f"{stem}_{image_size}.onnx"
+    elif backend == "openvino":
+        cached = cache_dir / f"{stem}_{image_size}_openvino_model"
+    else:
+        raise ValueError(f"Backend {backend} has no export format")
+    if cached.exists():
+        return cached
+
+    from ultralytics import YOLO
+
+    print(f"📦 Exporting {model_path} to {backend} (first run only)...", file=sys.stderr)
+    # Exporter tooling prints progress of its own
+    with contextlib.redirect_stdout(sys.stderr):
+        exported = Path(YOLO(model_path).export(format=backend, imgsz=image_size, dynamic=True))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(exported), str(cached))
+    print(f"📦 Cached {backend} model at {cached}", file=sys.stderr)
+    return cached
+
+
+def quiet_ultralytics():
+    """Stop Ultralytics logging to stdout (errors still show)"""
+    # Read by ultralytics on import; the logger level covers an earlier import
+    os.environ["YOLO_VERBOSE"] = "False"
+    if "ultralytics" in sys.modules:
+        logging.getLogger("ultralytics").setLevel(logging.ERROR)
+
+
+def load_detector(backend="torch", model_path=MODEL_PATH, threads=None, device=None, conf=CONF_THRESHOLD, quiet=False):
+    """
+    Load a detector for backend, falling back to PyTorch on the CPU on failure.
+
+    Args:
+        backend (str): "torch", "onnx", "openvino" or "onnx-int8"
+        model_path (str): PyTorch weights to load or export from
+        threads (int): Intra-op thread count (None = runtime default)
+        device (str): torch backend only; None picks mps when available, else cpu
+        conf (float): Confidence threshold
+        quiet (bool): Silence Ultralytics' stdout logging (when stdout carries detections)
+    """
+    if quiet:
+        quiet_ultralytics()
+    try:
+        if backend == "torch":
+            return TorchDetector(model_path, device=device, threads=threads, conf=conf)
+        if backend == "onnx":
+            return OnnxDetector(export_model("onnx", model_path), threads=threads, conf=conf)
+        if backend == "openvino":
+            return OpenVinoDetector(export_model("openvino", model_path), threads=threads, conf=conf)
+        if backend == "onnx-int8":
+            from quantize_detector import quantized_model
+
+            return OnnxDetector(
+                quantized_model(model_path), threads=threads, name="onnx-int8", conf=conf
+            )
+        raise ValueError(f"Unknown detector backend: {backend}. Available: {BACKENDS}")
+    except Exception as e:
+        if backend == "torch" and device in (None, "cpu"):
+            raise
+        print(f"❌ Could not load {backend} detector: {e}", file=sys.stderr)
+        print("🔄 Falling back to PyTorch on CPU...", file=sys.stderr)
+        return TorchDetector(model_path, device="cpu", threads=threads, conf=conf)
+
+
+def benchmark_detectors(backends, frames, model_path=MODEL_PATH, threads=None, warmup=5):
+    """Time each backend on the same frames and print latency percentiles"""
+    print(f"⏱️ Benchmarking {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    report = {}
+    for backend in backends:
+        load_start = time.perf_counter()
+        detector = load_detector(backend, model_path, threads=threads)
+        load_time = time.perf_counter() - load_start
+        if detector.name != backend:
+            print(f"⚠️ Skipping {backend}: fell back to {detector.name}")
+            continue
+
+        for frame in frames[:warmup]:
+            detector.detect(frame)
+        latencies = []
+        boxes = 0
+        for frame in frames:
+            start = time.perf_counter()
+            detections = detector.detect(frame)
+            latencies.append(time.perf_counter() - start)
+            boxes += len(detections)
+
+        latencies = np.array(latencies) * 1000
+        report[backend] = latencies
+        print(
+            f"  {backend:<9} load {load_time:.2f}s | mean {latencies.mean():.1f}ms | "
+            f"p50 {np.percentile(latencies, 50):.1f}ms | p95 {np.percentile(latencies, 95):.1f}ms | "
+            f"{1000 / latencies.mean():.1f} FPS | {boxes / len(frames):.1f} boxes/frame"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from frame_source import open_frame_source
+
+    parser = argparse.ArgumentParser(description="Compare detector backend latency on the same frames")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--source", default="synthetic")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--model", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    frames = []
+    with open_frame_source(args.source) as source:
+        for _ in range(args.frames):
+            frame = source.read()
+            if frame is None:
+                break
+            frames.append(frame.copy())
+
+    benchmark_detectors(args.backends.split(","), frames, args.model, threads=args.threads)
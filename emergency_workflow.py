@@ -1,61 +1,73 @@
+import asyncio
+import functools
 import os
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import cv2
-import numpy as np
-from mss import mss
 from dotenv import load_dotenv
-from text_to_speech import speak_text
-from twilio.rest import Client
-import google.generativeai as genai
-from PIL import Image
+from event_log import EVENT_LOG_DIR, log_event
+from frame_encoding import capture_snapshot, image_bytes
+from location_provider import LOCATION_LIVE_REFINE, format_age, get_location_provider
+from sms_fanout import emergency_contacts
+from sms_outbox import get_outbox, new_event_id
+from speech_service import speak_emergency
+from vision_providers import VisionError, describe_image
 
 # Load environment variables
 load_dotenv()
 
+EMERGENCY_ANNOUNCEMENT = (
+    "Emergency workflow activated. Capturing screenshot, getting your location and alerting emergency contact."
+)
+
+# Fixed phrases spoken by this workflow, pre-warmed in the TTS cache at startup
+PROMPTS = [EMERGENCY_ANNOUNCEMENT]
+
+# Per-step deadlines in seconds; a late step is abandoned and its fallback used
+SCREENSHOT_DEADLINE = 2
+VISION_DEADLINE = 10
+LOCATION_DEADLINE = 5
+SMS_DEADLINE = 10
+
+# Screenshots are taken on one long-lived thread, so every emergency reuses the
+# warm per-thread capture handle instead of opening a new one
+_capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="emergency-capture")
+
+def warm_up_capture():
+    """Open the emergency capture thread's handle ahead of time (returns a Future)"""
+    from capture_service import warm_up
+
+    return _capture_executor.submit(warm_up)
+
 def capture_emergency_screenshot():
     """Capture screenshot at the moment of emergency for context"""
     try:
         print("📸 Capturing emergency screenshot...")
         
-        # Use the same screen capture settings as your main system
-        sct = mss()
-        monitor = {"top": 140, "left": 25, "width": 400, "height": 600}
-        
-        # Take screenshot
-        screenshot = sct.grab(monitor)
-        frame = np.array(screenshot)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-        
-        # Create emergency screenshot filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"emergency_screenshot_{timestamp}.jpg"
+        # Use the same screen capture settings as your main system, encoded in memory
+        snapshot = capture_snapshot()
         
-        # Save the emergency screenshot
-        cv2.imwrite(filename, frame)
-        print(f"📸 Emergency screenshot saved: {filename}")
+        # Always keep emergency screenshots as evidence; written in the background
+        filename = snapshot.persist("emergency_screenshot")
+        print(f"📸 Emergency screenshot saving: {filename}")
         
-        return filename
+        return snapshot
         
     except Exception as e:
         print(f"❌ Error capturing emergency screenshot: {e}")
         return None
 
-def analyze_emergency_screenshot(image_path):
-    """Analyze the emergency screenshot and return a text description"""
-    if not image_path or not os.path.exists(image_path):
-        return "No screenshot available"
+def analyze_emergency_screenshot(image):
+    """
+    Analyze the emergency screenshot (Snapshot, JPEG bytes or file path)
+    
+    Returns:
+        str: Text description, or None if there is no screenshot or no analysis
+    """
+    if image is None or (isinstance(image, str) and not os.path.exists(image)):
+        return None
     
     try:
-        if not GEMINI_API_KEY:
-            return "Emergency screenshot captured (AI analysis unavailable)"
-        
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Open and prepare the image
-        image = Image.open(image_path)
-        
         # Emergency-focused prompt
         prompt = (
             "This is an emergency screenshot. Briefly describe what you see in 1-2 sentences. "
@@ -63,143 +75,222 @@ def analyze_emergency_screenshot(image_path):
             "relevant for emergency responders. Be concise and factual."
         )
         
-        # Analyze with Gemini
-        response = model.generate_content([prompt, image])
-        return response.text.strip()
+        # Analyze with whichever vision provider answers first, inside the step deadline
+        return describe_image(image_bytes(image), prompt, deadline=VISION_DEADLINE - 0.5)
+    
+    except VisionError as e:
+        print(f"❌ No vision provider available: {e}")
+        return None
         
     except Exception as e:
         print(f"❌ Error analyzing screenshot: {e}")
-        return "Emergency screenshot captured (analysis failed)"
+        return None
 
 def get_location():
-    """Get current location using IP-based geolocation"""
-    try:
-        # IP-based geolocation (city-level, approximate)
-        token = os.getenv("IPINFO_TOKEN")  # Optional: set this for better rate limits
-        url = "https://ipinfo.io/json" + (f"?token={token}" if token else "")
-        response = requests.get(url, timeout=4)
-        j = response.json()
-        lat, lon = map(float, j.get("loc", "0,0").split(","))
-        
-        return {
-            "lat": lat,
-            "lon": lon,
-            "ip": j.get("ip"),
-            "city": j.get("city"),
-            "region": j.get("region"),
-            "country": j.get("country"),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-    except Exception as e:
-        print(f"❌ Error getting location: {e}")
-        return {
-            "lat": 0,
-            "lon": 0,
-            "ip": "unknown",
-            "city": "unknown",
-            "region": "unknown", 
-            "country": "unknown",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+    """Live location lookup, used to refine the last-known fix; None on failure"""
+    # Retries stay inside the step deadline so the fallback still has time to run
+    return get_location_provider().refresh(deadline=LOCATION_DEADLINE - 1)
 
-def send_emergency_sms(location_info, screenshot_path=None, screenshot_description=""):
-    """Send SOS SMS with location and screenshot description to emergency contact"""
-    
-    # Get credentials from environment variables
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    from_number = os.getenv("TWILIO_PHONE_NUMBER")
-    emergency_contact = os.getenv("EMERGENCY_CONTACT")
-    
-    if not all([account_sid, auth_token, from_number, emergency_contact]):
-        print("❌ Twilio credentials not set in environment variables")
-        return
-    
-    client = Client(account_sid, auth_token)
-    
-    # Create a more natural-looking emergency message
+def unknown_location():
+    """Placeholder location used when there is no saved fix and the live lookup fails"""
+    return {
+        "lat": 0,
+        "lon": 0,
+        "ip": "unknown",
+        "city": "unknown",
+        "region": "unknown", 
+        "country": "unknown",
+        "source": "unknown",
+        "age_seconds": None,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def build_emergency_message(location_info, screenshot_description="", follow_up=False):
+    """Build the SOS text; a follow-up carries the visual description that arrived later"""
+    header = "🚨 EMERGENCY UPDATE" if follow_up else "🚨 EMERGENCY ALERT"
     message_body = (
-        f"🚨 EMERGENCY ALERT\n\n"
+        f"{header}\n\n"
         f"📍 Location: {location_info['city']}, {location_info['region']}\n"
         f"🌐 Coordinates: {location_info['lat']:.5f}, {location_info['lon']:.5f}\n"
-        f"🕐 Time: {location_info['timestamp']}\n"
+        f"🛰️ Location fix: {format_age(location_info.get('age_seconds'))}\n"
+        f"🕐 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
     )
     
     # Add screenshot description if available
-    if screenshot_description and screenshot_description != "No screenshot available":
+    if screenshot_description:
         message_body += f"👁️ Visual: {screenshot_description}\n"
     
     message_body += f"\nThis is an automated emergency alert."
-    
-    try:
-        # Send message with natural formatting
-        message = client.messages.create(
-            body=message_body,
-            from_=from_number,
-            media_url=image_path,
-            to=emergency_contact
-        )
-        print(f"✅ SOS sent to {emergency_contact}")
-        if screenshot_path and os.path.exists(screenshot_path):
-            print(f"📷 Screenshot analyzed and described in message")
-            
-    except Exception as e:
-        print(f"❌ Failed to send SOS: {e}")
+    return message_body
 
-def emergency_workflow():
-    """Complete emergency workflow: screenshot + location + alerts + logging"""
+def send_emergency_sms(location_info, screenshot_path=None, screenshot_description="", follow_up=False, outbox=None, recipients=None, event_id=None):
+    """
+    Queue the SOS SMS with location and screenshot description for every emergency contact
     
-    print("🚨 EMERGENCY WORKFLOW ACTIVATED 🚨")
+    Returns as soon as the texts are durably in the outbox; its background
+    sender delivers them and retries failures.
     
-    # Step 1: Immediately capture screenshot for context
-    screenshot_path = capture_emergency_screenshot()
+    Args:
+        outbox (SmsOutbox): Outbox to queue in (defaults to the shared outbox)
+        recipients (list): Phone numbers (defaults to the configured emergency contacts)
+        event_id (str): Identifier of this emergency; queueing the same alert twice sends it once
     
-    # Step 2: Analyze the screenshot with AI
-    print("🤖 Analyzing emergency screenshot...")
-    screenshot_description = analyze_emergency_screenshot(screenshot_path)
-    print(f"📸 Screenshot analysis: {screenshot_description}")
+    Returns:
+        OutboxReceipt: Truthy once queued; .statuses() reports per-recipient delivery (None if not configured)
+    """
     
-    # Step 3: Get current location
-    print("📍 Getting location...")
-    location_info = get_location()
+    # Get credentials from environment variables
+    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+    from_number = os.getenv("TWILIO_PHONE_NUMBER")
+    recipients = recipients if recipients is not None else emergency_contacts()
     
-    # Step 4: Create emergency message
-    location_message = (
-        f"Emergency detected. "
-        f"Location: {location_info['city']}, {location_info['region']}, {location_info['country']}. "
-        f"Coordinates: {location_info['lat']:.5f}, {location_info['lon']:.5f}. "
-        f"Time: {location_info['timestamp']}"
-    )
+    if (outbox is None and not all([account_sid, auth_token])) or not from_number or not recipients:
+        print("❌ Twilio credentials not set in environment variables")
+        return None
     
-    # Step 5: Speak emergency alert
-    print("🔊 Speaking emergency alert...")
-    speak_text("Emergency workflow activated. Capturing screenshot, getting your location and alerting emergency contact.")
+    outbox = outbox or get_outbox()
+    # Built once and shared by every recipient
+    message_body = build_emergency_message(location_info, screenshot_description, follow_up)
     
-    # Step 6: Send alerts with screenshot description
-    send_emergency_sms(location_info, screenshot_path, screenshot_description)
+    # The screenshot stays local (Twilio media must be a public URL); its
+    # description goes in the text instead
+    receipt = outbox.enqueue(
+        recipients, message_body, from_number, event_id=event_id, kind="sos_update" if follow_up else "sos"
+    )
+    print(f"📤 SOS {'update ' if follow_up else ''}queued for {', '.join(recipients)}")
+    if screenshot_description:
+        print(f"📷 Screenshot analyzed and described in message")
+    return receipt
+
+def write_emergency_log(location_info, screenshot_path, screenshot_description, timings=None, sms_status=None):
+    """Record the emergency in the structured event log (written in the background)"""
+    log_event(
+        "emergency",
+        "EMERGENCY",
+        location=location_info,
+        screenshot=screenshot_path,
+        screenshot_description=screenshot_description,
+        contacts=emergency_contacts(),
+        sms_status=sms_status or [],
+        timings=timings or {},
+    )
+
+async def run_step(name, function, *args, deadline, fallback=None, timings=None, started=None, executor=None):
+    """
+    Run a blocking step in a worker thread, giving up after deadline seconds
     
-    # Step 7: Log everything to file for record keeping
-    log_file = f"emergency_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    with open(log_file, 'w') as f:
-        f.write(f"EMERGENCY LOG\n")
-        f.write(f"Timestamp: {location_info['timestamp']}\n")
-        f.write(f"Location: {location_info['lat']:.5f},{location_info['lon']:.5f}\n")
-        f.write(f"Address: {location_info['city']}, {location_info['region']}, {location_info['country']}\n")
-        f.write(f"IP: {location_info['ip']}\n")
-        f.write(f"Screenshot: {screenshot_path if screenshot_path else 'None captured'}\n")
-        f.write(f"Screenshot Analysis: {screenshot_description}\n")
-        f.write(f"Emergency Contact: {os.getenv('EMERGENCY_CONTACT', 'Not set')}\n")
+    Pass a private executor: asyncio.run joins the default executor on exit,
+    so a hung step there would hold up the workflow's return past its deadline.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        result = await asyncio.wait_for(loop.run_in_executor(executor, function, *args), timeout=deadline)
+    except asyncio.TimeoutError:
+        print(f"⏱️ {name} missed its {deadline:.0f}s deadline")
+        result = fallback
+    except Exception as e:
+        print(f"❌ {name} failed: {e}")
+        result = fallback
+    if timings is not None:
+        timings[name] = round(time.perf_counter() - started, 3)
+    return result
+
+async def emergency_workflow_async():
+    """
+    Concurrent emergency workflow
     
-    print(f"📝 Emergency logged to: {log_file}")
-    print("✅ Emergency workflow complete!")
+    The first SMS goes out right away with the last-known location fix (read
+    from memory), without waiting for the vision description. Screenshot
+    capture + analysis and an optional live location lookup run at the same
+    time, each with its own deadline; the description and any refined
+    location follow in an update SMS. Only without a saved fix does the
+    first SMS wait for the live lookup.
+    """
     
-    return {
-        "location": location_info,
-        "screenshot": screenshot_path,
-        "screenshot_description": screenshot_description,
-        "emergency_contact": os.getenv('EMERGENCY_CONTACT', 'Not set'),
-        "log_file": log_file
-    }
+    print("🚨 EMERGENCY WORKFLOW ACTIVATED 🚨")
+    started = time.perf_counter()
+    timings = {}
+    # Steps run on a private pool that is not joined on return, so a hung call
+    # cannot hold the workflow past its deadlines
+    executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="emergency")
+    step = functools.partial(run_step, timings=timings, started=started, executor=executor)
+    try:
+        # Shared by both texts so a re-run step cannot queue the same alert twice
+        send_sms = functools.partial(send_emergency_sms, event_id=new_event_id())
+        
+        # Announce right away in the background; this interrupts any other speech
+        # and never delays the SMS
+        print("🔊 Speaking emergency alert...")
+        speak_emergency(EMERGENCY_ANNOUNCEMENT)
+        
+        async def capture_and_analyze():
+            snapshot = await step(
+                "screenshot", capture_emergency_screenshot, deadline=SCREENSHOT_DEADLINE, executor=_capture_executor
+            )
+            screenshot_path = snapshot.path if snapshot is not None else None
+            print("🤖 Analyzing emergency screenshot...")
+            description = await step(
+                "vision", analyze_emergency_screenshot, snapshot,
+                deadline=VISION_DEADLINE,
+            )
+            print(f"📸 Screenshot analysis: {description or 'unavailable'}")
+            return screenshot_path, description
+        
+        vision_task = asyncio.create_task(capture_and_analyze())
+        
+        # The last-known fix is read from memory; a live lookup only refines it
+        location_info = get_location_provider().current()
+        refine_task = None
+        if location_info is None or LOCATION_LIVE_REFINE:
+            refine_task = asyncio.create_task(step("location", get_location, deadline=LOCATION_DEADLINE))
+        if location_info is not None:
+            print(f"📍 Using saved location fix ({format_age(location_info['age_seconds'])})")
+        else:
+            print("📍 No saved location fix, waiting for a live lookup...")
+            location_info = await refine_task or unknown_location()
+            refine_task = None
+        
+        # First alert: location only
+        first_sent = await step("first_sms", send_sms, location_info, deadline=SMS_DEADLINE)
+        print(f"⏱️ Time to first SMS queued: {timings['first_sms']:.2f}s")
+        
+        # Follow-up with the visual description and, if it moved, the refined location
+        screenshot_path, screenshot_description = await vision_task
+        refined = await refine_task if refine_task is not None else None
+        moved = refined is not None and (refined["lat"], refined["lon"]) != (location_info["lat"], location_info["lon"])
+        if refined is not None:
+            location_info = refined
+        # Fallbacks return None; an update with nothing new would only alarm the contacts again
+        if screenshot_description or moved:
+            await step(
+                "follow_up_sms", send_sms, location_info, screenshot_path, screenshot_description, True,
+                deadline=SMS_DEADLINE, fallback=False,
+            )
+        
+        # Log everything to the event log for record keeping
+        sms_status = first_sent.statuses() if first_sent else []
+        write_emergency_log(location_info, screenshot_path, screenshot_description, timings, sms_status)
+        
+        print(f"📝 Emergency logged to the event log ({EVENT_LOG_DIR}/)")
+        print(f"⏱️ Emergency step timings (s since trigger): {timings}")
+        print("✅ Emergency workflow complete!")
+        
+        return {
+            "location": location_info,
+            "screenshot": screenshot_path,
+            "screenshot_description": screenshot_description,
+            "emergency_contacts": emergency_contacts(),
+            "sms_queued": bool(first_sent),
+            "sms_status": sms_status,
+            "timings": timings,
+        }
+    finally:
+        executor.shutdown(wait=False)
+
+def emergency_workflow():
+    """Complete emergency workflow: screenshot + location + alerts + logging"""
+    return asyncio.run(emergency_workflow_async())
 
 if __name__ == "__main__":
     emergency_workflow()
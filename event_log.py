@@ -0,0 +1,405 @@
+"""
+Structured event log shared by every workflow.
+
+This replaces workflow_log.txt, message_log.txt, stress_relief_log.txt and
+the emergency_log_<ts>.txt file written per emergency. log_event() puts the
+event on an in-memory queue and returns immediately. One writer thread
+batches queued events and appends them as compact JSON lines to the current
+segment in EVENT_LOG_DIR. The segment file stays open, so nothing is opened
+per event.
+
+Segments are named events-YYYYMMDD-NNN.jsonl. A new one starts when the local
+date changes or the current one passes EVENT_LOG_MAX_BYTES. Closed segments
+are gzip-compressed. A query for a time range only opens the segments from
+the days it covers, which keeps months of history fast to search. Past
+records (the legacy import) are sorted and written to their own per-day
+segments, so they never rotate or split the live one.
+
+Each line holds "ts" (epoch seconds), "event" and usually "workflow", plus
+the fields of that event:
+    {"ts":1760720000.123,"event":"workflow_completed","workflow":"SNAPSHOT","duration_ms":2140.5}
+
+Usage:
+    python event_log.py query [--workflow EMERGENCY] [--event ...] [--since 2025-09-01] [--until 2025-10-01] [--count]
+    python event_log.py summary [--since ...] [--until ...]
+    python event_log.py import-legacy   # copy the old *_log.txt files into the event log
+    python event_log.py benchmark [--events 200000]
+"""
+
+import atexit
+import glob
+import gzip
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "logs")
+EVENT_LOG_MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", str(16 * 1024 * 1024)))
+EVENT_LOG_FLUSH_INTERVAL = float(os.getenv("EVENT_LOG_FLUSH_INTERVAL", "1.0"))
+EVENT_LOG_BATCH = 512
+# Queue markers; everything queued before one is written before it is handled
+_FLUSH = "flush"
+_CLOSE = "close"
+_BACKFILL = "backfill"
+SEGMENT_PATTERN = re.compile(r"events-(\d{8})-(\d{3})\.jsonl(\.gz)?$")
+
+
+def _segment_day(path):
+    match = SEGMENT_PATTERN.search(os.path.basename(path))
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+
+def segments(directory=EVENT_LOG_DIR):
+    """Segment files in chronological order"""
+    paths = [path for path in glob.glob(os.path.join(directory, "events-*.jsonl*")) if SEGMENT_PATTERN.search(path)]
+    return sorted(paths, key=lambda path: SEGMENT_PATTERN.search(path).groups()[:2])
+
+
+class EventLog:
+    """
+    Buffered JSON-lines event log with a single writer thread.
+
+    Args:
+        directory (str): Where segments are written
+        max_bytes (int): Start a new segment once the current one is this large
+        flush_interval (float): Longest time an event waits in memory before it is written
+        compress (bool): gzip segments once they are closed
+    """
+
+    def __init__(self, directory=EVENT_LOG_DIR, max_bytes=EVENT_LOG_MAX_BYTES, flush_interval=EVENT_LOG_FLUSH_INTERVAL, compress=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.path = None
+        self._file = None
+        self._day = None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def log(self, event, workflow=None, ts=None, **fields):
+        """Queue an event; never blocks on disk"""
+        self._queue.put(make_record(event, workflow, ts, **fields))
+
+    def flush(self, timeout=5.0):
+        """Wait until everything logged so far is on disk; returns False on timeout"""
+        done = threading.Event()
+        self._queue.put((_FLUSH, done, None))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Write what is queued, close (and compress) the current segment and stop the writer"""
+        done = threading.Event()
+        self._queue.put((_CLOSE, done, None))
+        return done.wait(timeout)
+
+    def backfill(self, records, timeout=60.0):
+        """
+        Write past records (from make_record) into their own per-day segments.
+
+        The records are sorted and written one day at a time next to the live
+        segment, which stays open. Waits until they are on disk; returns False on timeout.
+        """
+        done = threading.Event()
+        self._queue.put((_BACKFILL, done, list(records)))
+        return done.wait(timeout)
+
+    def _segment_path(self, day, reuse_last=True):
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"events-{day:%Y%m%d}-")
+        taken = [int(SEGMENT_PATTERN.search(path).group(2)) for path in glob.glob(prefix + "*") if SEGMENT_PATTERN.search(path)]
+        number = max(taken, default=-1)
+        # Keep appending to today's last segment after a restart, if it is still open for writing
+        if reuse_last and number >= 0 and os.path.exists(f"{prefix}{number:03d}.jsonl") and os.path.getsize(f"{prefix}{number:03d}.jsonl") < self.max_bytes:
+            return f"{prefix}{number:03d}.jsonl"
+        return f"{prefix}{number + 1:03d}.jsonl"
+
+    def _open_segment(self, day):
+        if self._file is not None:
+            self._close_segment()
+        self.path = self._segment_path(day)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._day = day
+
+    def _close_segment(self):
+        self._file.close()
+        self._file = None
+        if self.compress:
+            self._compress(self.path)
+
+    def _compress(self, path):
+        with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+            target.writelines(source)
+        os.remove(path)
+
+    def _write(self, records):
+        for record in records:
+            day = datetime.fromtimestamp(record["ts"]).date()
+            if self._file is None or day != self._day or self._file.tell() >= self.max_bytes:
+                self._open_segment(day)
+            self._file.write(_encode(record))
+        self._file.flush()
+
+    def _write_backfill(self, records):
+        ordered = sorted(records, key=lambda record: record["ts"])
+        for day, day_records in itertools.groupby(ordered, key=lambda record: datetime.fromtimestamp(record["ts"]).date()):
+            path = f = None
+            for record in day_records:
+                if f is None or f.tell() >= self.max_bytes:
+                    if f is not None:
+                        f.close()
+                        if self.compress:
+                            self._compress(path)
+                    # Always a fresh segment: the live one for this day stays as it is
+                    path = self._segment_path(day, reuse_last=False)
+                    f = open(path, "a", encoding="utf-8")
+                f.write(_encode(record))
+            f.close()
+            if self.compress:
+                self._compress(path)
+
+    def _run(self):
+        while True:
+            batch = []
+            marker = None
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < EVENT_LOG_BATCH:
+                try:
+                    record = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if isinstance(record, tuple):
+                    marker = record
+                    break
+                batch.append(record)
+            if batch:
+                try:
+                    self._write(batch)
+                except OSError as e:
+                    print(f"❌ Could not write {len(batch)} event(s): {e}")
+            if marker is None:
+                continue
+            kind, done, records = marker
+            if kind == _BACKFILL:
+                try:
+                    self._write_backfill(records)
+                except OSError as e:
+                    print(f"❌ Could not write {len(records)} past event(s): {e}")
+            if kind == _CLOSE:
+                if self._file is not None:
+                    self._close_segment()
+                done.set()
+                return
+            done.set()
+
+
+def make_record(event, workflow=None, ts=None, **fields):
+    """Event dict as it is stored: ts (now unless given), event, workflow and fields"""
+    record = {"ts": round(time.time() if ts is None else ts, 3), "event": event}
+    if workflow is not None:
+        record["workflow"] = workflow
+    record.update(fields)
+    return record
+
+
+def _encode(record):
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str) + "\n"
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """Shared event log; flushed at exit"""
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            _event_log = EventLog()
+            atexit.register(_event_log.flush)
+        return _event_log
+
+
+def log_event(event, workflow=None, **fields):
+    """
+    Record an event in the shared log without waiting for disk.
+
+    Args:
+        event (str): Event type, e.g. "workflow_completed"
+        workflow (str): Workflow name, used by query filters
+        **fields: JSON-serializable details (non-serializable values are stored as strings)
+    """
+    get_event_log().log(event, workflow, **fields)
+
+
+def _open_segment_file(path):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")
+
+
+def query(workflow=None, event=None, since=None, until=None, directory=EVENT_LOG_DIR):
+    """
+    Yield events matching every given filter, oldest first.
+
+    Args:
+        workflow (str): Only this workflow
+        event (str): Only this event type
+        since (datetime): Only events at or after this time
+        until (datetime): Only events before this time
+        directory (str): Event log directory
+    """
+    since_ts = since.timestamp() if since else None
+    until_ts = until.timestamp() if until else None
+    # Cheap substring checks skip most non-matching lines before JSON parsing
+    needles = [f'"{key}":{json.dumps(value, ensure_ascii=False)}' for key, value in (("workflow", workflow), ("event", event)) if value]
+    for path in segments(directory):
+        day = _segment_day(path)
+        if since and day < since.date() or until and day > until.date():
+            continue
+        with _open_segment_file(path) as f:
+            for line in f:
+                if not all(needle in line for needle in needles):
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if workflow and record.get("workflow") != workflow or event and record.get("event") != event:
+                    continue
+                if since_ts is not None and record["ts"] < since_ts or until_ts is not None and record["ts"] >= until_ts:
+                    continue
+                yield record
+
+
+def summarize(records):
+    """Event counts per day, workflow and event type"""
+    counts = {}
+    for record in records:
+        key = (datetime.fromtimestamp(record["ts"]).strftime("%Y-%m-%d"), record.get("workflow", "-"), record["event"])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def import_legacy(directory=".", event_log=None):
+    """
+    Copy the old text logs into the event log (the text files are left in place)
+
+    The entries are backfilled into their own per-day segments rather than
+    logged live, so replaying years of history does not rotate today's segment.
+    """
+    event_log = event_log or get_event_log()
+    records = []
+
+    def parse_time(text):
+        return datetime.strptime(text.strip(), "%Y-%m-%d %H:%M:%S").timestamp()
+
+    line_formats = {
+        "workflow_log.txt": (re.compile(r"^(.{19}): Executed (\w+) workflow$"), lambda m: ("workflow_completed", m.group(2), {})),
+        "message_log.txt": (re.compile(r"^(.{19}): (.*)$"), lambda m: ("message_queued", "MESSAGE", {"text": m.group(2)})),
+        "stress_relief_log.txt": (
+            re.compile(r"^(.{19}): Stress relief session - (.*)$"),
+            lambda m: ("stress_relief_session", "STRESS_RELIEF", {"summary": m.group(2)}),
+        ),
+    }
+    for name, (pattern, convert) in line_formats.items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                match = pattern.match(line.rstrip("\n"))
+                if match:
+                    event, workflow, fields = convert(match)
+                    records.append(make_record(event, workflow, parse_time(match.group(1)), legacy=name, **fields))
+
+    for path in sorted(glob.glob(os.path.join(directory, "emergency_log_*.txt"))):
+        fields = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                key, separator, value = line.partition(": ")
+                if separator:
+                    fields[key.strip().lower().replace(" ", "_")] = value.strip()
+        if "timestamp" not in fields:
+            continue
+        ts = parse_time(fields.pop("timestamp"))
+        records.append(make_record("emergency", "EMERGENCY", ts, legacy=os.path.basename(path), **fields))
+    event_log.backfill(records)
+    return len(records)
+
+
+def benchmark_event_log(events=200_000):
+    """Logging cost on the caller, writer throughput, and query time over a synthetic 90-day history"""
+    import tempfile
+
+    workflows = ["SNAPSHOT", "MESSAGE", "STRESS_RELIEF", "EMERGENCY"]
+    with tempfile.TemporaryDirectory() as directory:
+        event_log = EventLog(directory, max_bytes=4 * 1024 * 1024)
+        start_ts = time.time() - 90 * 86400
+        start = time.perf_counter()
+        for index in range(events):
+            event_log.log(
+                "workflow_completed", workflows[index % 4], ts=start_ts + index * 90 * 86400 / events, duration_ms=index % 5000
+            )
+        logged = time.perf_counter() - start
+        event_log.close(timeout=120)
+        written = time.perf_counter() - start
+        size = sum(os.path.getsize(path) for path in segments(directory))
+
+        print(f"⏱️ Event log: {events} events over 90 days -> {len(segments(directory))} segments, {size / 1024 / 1024:.1f} MiB")
+        print(f"  log_event on the caller:  {logged / events * 1e6:6.2f} µs per event")
+        print(f"  written to disk:          {events / written:,.0f} events/s")
+        for label, kwargs in (
+            ("query EMERGENCY, all 90 days", {"workflow": "EMERGENCY"}),
+            ("query all, last 7 days", {"since": datetime.now() - timedelta(days=7)}),
+        ):
+            start = time.perf_counter()
+            matched = sum(1 for _ in query(directory=directory, **kwargs))
+            print(f"  {label:<30} {matched:7d} events in {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+
+def _parse_time(text):
+    """Accept YYYY-MM-DD or an ISO date-time"""
+    return datetime.fromisoformat(text)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query and maintain the structured event log")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("query", "Print matching events as JSON lines"), ("summary", "Event counts per day and workflow")):
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument("--workflow", help="Only this workflow (e.g. EMERGENCY)")
+        subparser.add_argument("--event", help="Only this event type (e.g. workflow_failed)")
+        subparser.add_argument("--since", type=_parse_time, help="Start time, YYYY-MM-DD or ISO date-time")
+        subparser.add_argument("--until", type=_parse_time, help="End time (exclusive)")
+        subparser.add_argument("--dir", default=EVENT_LOG_DIR, help="Event log directory")
+    subparsers.choices["query"].add_argument("--count", action="store_true", help="Only print the number of matches")
+    subparsers.add_parser("import-legacy", help="Copy the old *_log.txt files into the event log")
+    benchmark_parser = subparsers.add_parser("benchmark", help="Write and query a synthetic history")
+    benchmark_parser.add_argument("--events", type=int, default=200_000)
+    args = parser.parse_args()
+
+    if args.command in ("query", "summary"):
+        records = query(args.workflow, args.event, args.since, args.until, args.dir)
+        if args.command == "summary":
+            for (day, workflow, event), count in sorted(summarize(records).items()):
+                print(f"{day}  {workflow:<14} {event:<22} {count:6d}")
+        elif args.count:
+            print(sum(1 for _ in records))
+        else:
+            for record in records:
+                print(json.dumps(record, ensure_ascii=False))
+    elif args.command == "import-legacy":
+        print(f"📥 Imported {import_legacy()} legacy log entries into {EVENT_LOG_DIR}/")
+    else:
+        benchmark_event_log(args.events)
@@ -0,0 +1,165 @@
+"""
+In-memory JPEG encoding for captured frames.
+
+The analysis workflows used to cv2.imwrite every capture, read the file back
+(or Image.open it) and only then build the upload. Here a frame is encoded
+once, straight from the numpy buffer into JPEG bytes, optionally downscaled
+so its longer side is at most SNAPSHOT_MAX_SIDE. Those bytes go to the vision
+providers as they are. Writing them to disk is optional and happens on a
+background writer thread, so the file system is off the capture→analysis
+path.
+
+Settings (environment):
+- SNAPSHOT_JPEG_QUALITY: JPEG quality for uploads (default 85)
+- SNAPSHOT_MAX_SIDE: longest side in pixels after downscaling (default 1024, 0 = full size)
+- SAVE_SNAPSHOTS: also keep snapshot-workflow captures on disk (default off;
+  emergency screenshots are always kept)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+SNAPSHOT_JPEG_QUALITY = int(os.getenv("SNAPSHOT_JPEG_QUALITY", "85"))
+SNAPSHOT_MAX_SIDE = int(os.getenv("SNAPSHOT_MAX_SIDE", "1024"))
+SAVE_SNAPSHOTS = os.getenv("SAVE_SNAPSHOTS", "0") == "1"
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            # Single thread: writes happen in capture order and never compete with each other
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-writer")
+        return _writer
+
+
+def encode_jpeg(frame, quality=SNAPSHOT_JPEG_QUALITY, max_side=SNAPSHOT_MAX_SIDE):
+    """
+    Encode a BGR frame to JPEG bytes in memory.
+
+    Args:
+        frame (np.ndarray): BGR image; it is not modified, so a reused capture buffer is fine
+        quality (int): JPEG quality 1-100
+        max_side (int): Downscale so the longer side is at most this many pixels (0 or None = no limit)
+    """
+    # Imported here so workflows that never capture do not load OpenCV
+    import cv2
+
+    height, width = frame.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        # INTER_AREA is several times slower at non-integer ratios; bilinear is
+        # alias-free enough down to half size
+        interpolation = cv2.INTER_LINEAR if scale >= 0.5 else cv2.INTER_AREA
+        frame = cv2.resize(
+            frame, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=interpolation
+        )
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+class Snapshot:
+    """
+    An encoded capture: JPEG bytes plus where (if anywhere) it is being saved.
+
+    Args:
+        jpeg (bytes): Encoded image
+        captured_at (datetime): Capture time
+        fingerprint (ImageFingerprint): Perceptual fingerprint of the frame (see snapshot_cache)
+    """
+
+    def __init__(self, jpeg, captured_at=None, fingerprint=None):
+        self.jpeg = jpeg
+        self.captured_at = captured_at or datetime.now()
+        self.fingerprint = fingerprint
+        self.path = None
+        self.saved = None
+
+    def persist(self, prefix="screenshot", directory="."):
+        """
+        Queue the JPEG to be written to <directory>/<prefix>_<timestamp>.jpg.
+
+        Returns the path immediately; self.saved is a Future that resolves once
+        the file is on disk.
+        """
+        if self.path is not None:
+            return self.path
+        filename = f"{prefix}_{self.captured_at.strftime('%Y%m%d_%H%M%S')}.jpg"
+        self.path = str(Path(directory) / filename)
+        self.saved = _get_writer().submit(_write_atomic, self.path, self.jpeg)
+        return self.path
+
+    def __len__(self):
+        return len(self.jpeg)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def capture_snapshot(quality=SNAPSHOT_JPEG_QUALITY, max_side=SNAPSHOT_MAX_SIDE):
+    """Capture a frame from the shared capture service, encode it in memory and fingerprint it"""
+    from capture_service import capture_frame
+    from snapshot_cache import fingerprint
+
+    frame = capture_frame()
+    return Snapshot(encode_jpeg(frame, quality, max_side), fingerprint=fingerprint(frame))
+
+
+def image_bytes(image):
+    """JPEG bytes from a Snapshot, raw bytes or (for older callers) an image file path"""
+    if isinstance(image, Snapshot):
+        return image.jpeg
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return bytes(image)
+    with open(image, "rb") as f:
+        return f.read()
+
+
+def benchmark_encoding(iterations=50):
+    """Compare imwrite + read-back against in-memory encoding on a synthetic frame"""
+    import tempfile
+
+    import cv2
+
+    from frame_source import SyntheticFrameSource
+
+    frame = SyntheticFrameSource(1920, 1080).read()
+
+    def timed(label, function):
+        function()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            size = function()
+        per_call = (time.perf_counter() - start) / iterations * 1000
+        print(f"  {label:<36} {per_call:7.2f} ms   {size / 1024:7.1f} KiB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "frame.jpg")
+
+        def disk_round_trip():
+            cv2.imwrite(path, frame)
+            with open(path, "rb") as f:
+                return len(f.read())
+
+        print(f"⏱️ Snapshot encoding, 1920x1080 frame, {iterations} iterations")
+        timed("imwrite + read back (previous)", disk_round_trip)
+        timed("in memory, full size, q95", lambda: len(encode_jpeg(frame, 95, 0)))
+        timed(f"in memory, max side {SNAPSHOT_MAX_SIDE}, q{SNAPSHOT_JPEG_QUALITY}", lambda: len(encode_jpeg(frame)))
+
+
+if __name__ == "__main__":
+    benchmark_encoding()
@@ -0,0 +1,289 @@
+"""
+Frame sources for the vision pipeline.
+
+Every capture path reads BGR frames through a FrameSource instead of calling
+mss directly. Besides the live screen region there are backends for a video
+file, a directory of images and a synthetic generator, so the detection and
+snapshot paths can be benchmarked headlessly on machines with no display.
+
+All backends write into one preallocated BGR buffer that is reused on every
+read(). Callers that keep a frame past the next read() must copy it.
+"""
+
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Livestream window coordinates shared by every capture path
+DEFAULT_REGION = {"top": 140, "left": 25, "width": 400, "height": 600}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+class FrameSource:
+    """Base class for anything that produces BGR frames of a fixed size"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+    def read(self):
+        """Return the next frame (a view of the shared buffer), or None when exhausted"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _fill_buffer(self, image):
+        """Copy or resize a decoded image into the shared buffer"""
+        if image.shape == self._buffer.shape:
+            np.copyto(self._buffer, image)
+        else:
+            cv2.resize(image, (self.width, self.height), dst=self._buffer)
+        return self._buffer
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class MssFrameSource(FrameSource):
+    """Live capture of a screen region with mss"""
+
+    def __init__(self, region=None):
+        from mss import mss
+
+        self.region = dict(region or DEFAULT_REGION)
+        super().__init__(self.region["width"], self.region["height"])
+        self._sct = mss()
+
+    def read(self):
+        screenshot = self._sct.grab(self.region)
+        # Wrap the grab buffer without copying and convert straight into our buffer
+        bgra = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+            screenshot.height, screenshot.width, 4
+        )
+        if bgra.shape[:2] != self._buffer.shape[:2]:
+            # HiDPI displays grab at a multiple of the logical region size
+            self.height, self.width = bgra.shape[:2]
+            self._buffer = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._buffer)
+        return self._buffer
+
+    def close(self):
+        self._sct.close()
+
+
+class VideoFrameSource(FrameSource):
+    """Frames decoded from a video file, optionally looping forever"""
+
+    def __init__(self, path, loop=False, size=None):
+        self.path = str(path)
+        self.loop = loop
+        self._cap = cv2.VideoCapture(self.path)
+        if not self._cap.isOpened():
+            raise ValueError(f"Could not open video file: {self.path}")
+        if size is None:
+            size = (
+                int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            )
+        super().__init__(*size)
+
+    def read(self):
+        ok, image = self._cap.read(self._buffer)
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, image = self._cap.read(self._buffer)
+        if not ok:
+            return None
+        if image is self._buffer:
+            return self._buffer
+        return self._fill_buffer(image)
+
+    def close(self):
+        self._cap.release()
+
+
+class ImageDirFrameSource(FrameSource):
+    """Frames loaded from the images in a directory, in filename order"""
+
+    def __init__(self, directory, loop=True, size=None):
+        self.directory = Path(directory)
+        self.loop = loop
+        self.paths = sorted(
+            p for p in self.directory.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+        if not self.paths:
+            raise ValueError(f"No images found in {self.directory}")
+        if size is None:
+            first = cv2.imread(str(self.paths[0]))
+            size = (first.shape[1], first.shape[0])
+        super().__init__(*size)
+        self._index = 0
+
+    def read(self):
+        # Skip unreadable files, but give up after one full pass
+        for _ in range(len(self.paths)):
+            if self._index >= len(self.paths):
+                if not self.loop:
+                    return None
+                self._index = 0
+            image = cv2.imread(str(self.paths[self._index]))
+            self._index += 1
+            if image is not None:
+                return self._fill_buffer(image)
+        return None
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Deterministic generated frames: a textured background with moving shapes.
+
+    Args:
+        width, height (int): Frame size in pixels
+        num_frames (int): Stop after this many frames (None = endless)
+        speed (float): Shape movement in pixels per frame (0 = static scene)
+        fps (float): Throttle read() to this rate to mimic a live feed (None = as fast as possible)
+        seed (int): Seed for shape placement and colors
+    """
+
+    def __init__(self, width=None, height=None, num_frames=None, speed=4.0, fps=None, seed=0):
+        super().__init__(width or DEFAULT_REGION["width"], height or DEFAULT_REGION["height"])
+        self.num_frames = num_frames
+        self.speed = speed
+        self.fps = fps
+        self._count = 0
+        self._last_read = None
+
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(40, 200, self.width, dtype=np.uint8)
+        self._background = np.empty_like(self._buffer)
+        self._background[:] = gradient[None, :, None]
+        self._background[..., 1] = np.linspace(60, 160, self.height, dtype=np.uint8)[:, None]
+        self._shapes = [
+            {
+                "pos": rng.uniform([0, 0], [self.width, self.height]),
+                "vel": rng.uniform(-1, 1, size=2),
+                "size": int(rng.integers(20, 80)),
+                "color": tuple(int(c) for c in rng.integers(0, 256, size=3)),
+            }
+            for _ in range(4)
+        ]
+
+    def read(self):
+        if self.num_frames is not None and self._count >= self.num_frames:
+            return None
+        if self.fps:
+            now = time.perf_counter()
+            if self._last_read is not None:
+                delay = 1 / self.fps - (now - self._last_read)
+                if delay > 0:
+                    time.sleep(delay)
+            self._last_read = time.perf_counter()
+
+        np.copyto(self._buffer, self._background)
+        for shape in self._shapes:
+            x, y = shape["pos"] + shape["vel"] * self.speed * self._count
+            x = int(x) % self.width
+            y = int(y) % self.height
+            size = shape["size"]
+            cv2.rectangle(self._buffer, (x, y), (x + size, y + size), shape["color"], -1)
+        self._count += 1
+        return self._buffer
+
+
+def parse_region(text):
+    """Parse "left,top,width,height" into an mss region dict"""
+    left, top, width, height = (int(v) for v in text.split(","))
+    return {"top": top, "left": left, "width": width, "height": height}
+
+
+def monitor_region(index=1):
+    """Return the full region of an mss monitor (1 = primary)"""
+    from mss import mss
+
+    with mss() as sct:
+        monitor = sct.monitors[index]
+    return {key: monitor[key] for key in ("top", "left", "width", "height")}
+
+
+def tile_region(region, rows, cols):
+    """Split a region into a rows x cols grid of sub-regions, row by row"""
+    tile_width = region["width"] // cols
+    tile_height = region["height"] // rows
+    return [
+        {
+            "top": region["top"] + row * tile_height,
+            "left": region["left"] + col * tile_width,
+            "width": tile_width,
+            "height": tile_height,
+        }
+        for row in range(rows)
+        for col in range(cols)
+    ]
+
+
+def open_frame_source(spec=None):
+    """
+    Open a frame source from a short spec string.
+
+    Args:
+        spec (str): One of
+            - "screen" (default): live mss capture of DEFAULT_REGION
+            - "synthetic" or "synthetic:WIDTHxHEIGHT": generated frames
+            - a directory path: images in that directory
+            - a file path: a video file
+
+    The FRAME_SOURCE environment variable is used when no spec is given.
+    """
+    spec = spec or os.getenv("FRAME_SOURCE", "screen")
+
+    if spec in ("screen", "mss"):
+        return MssFrameSource()
+    if spec.startswith("synthetic"):
+        _, _, size = spec.partition(":")
+        if size:
+            width, height = (int(v) for v in size.lower().split("x"))
+            return SyntheticFrameSource(width, height)
+        return SyntheticFrameSource()
+
+    path = Path(spec)
+    if path.is_dir():
+        return ImageDirFrameSource(path)
+    if path.is_file():
+        return VideoFrameSource(path)
+    raise ValueError(f"Unknown frame source: {spec}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Quick headless throughput check: python frame_source.py [spec] [frames]
+    spec = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with open_frame_source(spec) as source:
+        start = time.perf_counter()
+        count = 0
+        for _ in range(frames):
+            if source.read() is None:
+                break
+            count += 1
+        elapsed = time.perf_counter() - start
+
+    print(f"📸 {spec}: {count} frames of {source.width}x{source.height} in {elapsed:.3f}s "
+          f"({count / max(elapsed, 1e-9):.1f} FPS)")
@@ -0,0 +1,197 @@
+"""
+Shared HTTP connection pool for outbound calls.
+
+Bare requests.get/post and a fresh twilio Client per message open a new TCP
+connection and TLS handshake on every call. Everything outbound (ipinfo,
+Spotify, Twilio) goes through one keep-alive requests.Session instead, with
+tuned pool sizes, so a warm process (the orchestrator daemon) sends an SOS as
+a single request on an already-open connection.
+
+request() adds retries with exponential backoff bounded by an overall
+deadline: each attempt's timeout is capped by the time left, and a retry is
+only made if it can still start before the deadline. Only idempotent methods
+are retried unless the caller says otherwise, so an SMS POST is never sent
+twice.
+
+Run this module to benchmark pooled against unpooled calls on a local fake
+server that simulates a per-connection handshake cost:
+    python http_pool.py [--calls 100] [--handshake-ms 30]
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "8"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+DEFAULT_DEADLINE = 10.0
+CONNECT_TIMEOUT = 3.05
+RETRIES = 2
+BACKOFF = 0.2
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retries are handled by request() so they can respect deadlines
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def request(method, url, deadline=DEFAULT_DEADLINE, retries=RETRIES, backoff=BACKOFF, idempotent=None, session=None, **kwargs):
+    """
+    Send a request on the shared session with deadline-bounded retries.
+
+    Args:
+        method (str): HTTP method
+        url (str): Target URL
+        deadline (float): Seconds the whole call (all attempts) may take
+        retries (int): Extra attempts after a connection error, timeout or retryable status
+        backoff (float): First retry delay in seconds; doubles on each retry
+        idempotent (bool): Allow retries; defaults to True for GET/HEAD/OPTIONS/PUT/DELETE
+        session (requests.Session): Overrides the shared session (used by the benchmark)
+
+    Returns:
+        requests.Response: The last response (possibly a retryable error status)
+
+    Raises:
+        requests.RequestException: If no attempt produced a response before the deadline
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    attempts = 1 + (retries if idempotent else 0)
+    session = session or get_session()
+    give_up_at = time.monotonic() + deadline
+    delay = backoff
+
+    for attempt in range(attempts):
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"{method} {url} missed its {deadline:.1f}s deadline")
+        timeout = (min(CONNECT_TIMEOUT, remaining), remaining)
+        last_attempt = attempt == attempts - 1
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt or give_up_at - time.monotonic() <= delay:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            wait = max(delay, float(retry_after)) if retry_after.isdigit() else delay
+            if give_up_at - time.monotonic() <= wait:
+                return response
+            delay = wait
+        time.sleep(delay)
+        delay *= 2
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def twilio_http_client(timeout=DEFAULT_DEADLINE):
+    """Twilio HTTP client that sends through the shared keep-alive session"""
+    from twilio.http.http_client import TwilioHttpClient
+
+    http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+    http_client.session = get_session()
+    return http_client
+
+
+def warm_connections(urls, deadline=3.0):
+    """Open pooled connections ahead of time (HEAD requests; failures are ignored)"""
+    warmed = 0
+    for url in urls:
+        try:
+            request("HEAD", url, deadline=deadline, retries=0)
+            warmed += 1
+        except requests.RequestException as e:
+            print(f"❌ Could not pre-connect to {url}: {e}")
+    return warmed
+
+
+def benchmark_pooling(calls=100, handshake_ms=30.0, response_ms=2.0):
+    """Per-call latency against a local keep-alive server, with and without pooling"""
+    import statistics
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class FakeApiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; without TCP_NODELAY the
+        # body waits on a delayed ACK and keep-alive calls look 40 ms slower
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            # Stands in for the TCP + TLS handshake paid once per new connection
+            time.sleep(handshake_ms / 1000)
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(response_ms / 1000)
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeApiHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/json"
+
+    def measure(label, call):
+        call()
+        timings = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+        print(f"  {label:<28} median {statistics.median(timings):6.2f} ms | p95 {p95:6.2f} ms")
+        return statistics.median(timings)
+
+    print(f"⏱️ HTTP pooling benchmark: {calls} calls, {handshake_ms:.0f} ms simulated handshake per connection")
+    bare = measure("requests.get (new conn)", lambda: requests.get(url, timeout=5))
+    pooled_session = requests.Session()
+    pooled_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE))
+    pooled = measure("http_pool.request (pooled)", lambda: request("GET", url, session=pooled_session))
+    print(f"  speedup: {bare / pooled:.1f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs unpooled HTTP calls")
+    parser.add_argument("--calls", type=int, default=100, help="Calls per variant")
+    parser.add_argument("--handshake-ms", type=float, default=30.0, help="Simulated per-connection setup cost")
+    args = parser.parse_args()
+    benchmark_pooling(args.calls, args.handshake_ms)
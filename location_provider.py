@@ -0,0 +1,196 @@
+"""
+Last-known location with background refresh.
+
+Looking the location up only when the emergency starts costs a network round
+trip at the worst moment, and a failed lookup used to put 0,0 in the SOS.
+The provider looks the location up ahead of time, refreshes it every
+LOCATION_REFRESH_INTERVAL seconds on a daemon thread and persists each fix
+to LOCATION_CACHE_FILE. The emergency path then reads the last fix from
+memory. After a restart the fix is reloaded from disk, so a process that has
+just started and is offline still has one. Every fix records when it was
+taken, so the SMS can state its age. A live lookup during the emergency is
+only a refinement.
+
+Settings (environment):
+- LOCATION_CACHE_FILE: where the last fix is kept (default last_location.json)
+- LOCATION_REFRESH_INTERVAL: seconds between background lookups (default 300)
+- LOCATION_LIVE_REFINE: also do a live lookup during an emergency (default 1)
+- IPINFO_TOKEN: optional ipinfo.io token for better rate limits
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOCATION_CACHE_FILE = os.getenv("LOCATION_CACHE_FILE", "last_location.json")
+LOCATION_REFRESH_INTERVAL = float(os.getenv("LOCATION_REFRESH_INTERVAL", "300"))
+LOCATION_LIVE_REFINE = os.getenv("LOCATION_LIVE_REFINE", "1") == "1"
+LOCATION_LOOKUP_DEADLINE = 4.0
+# Wait before retrying after a failed background lookup
+LOCATION_RETRY_INTERVAL = 30.0
+
+
+def lookup_location(deadline=LOCATION_LOOKUP_DEADLINE):
+    """
+    Live IP-based geolocation (city-level, approximate) via ipinfo.io.
+
+    Returns:
+        dict: lat, lon, ip, city, region, country, fixed_at (epoch seconds) and source
+
+    Raises:
+        requests.RequestException, ValueError: If the lookup fails
+    """
+    from http_pool import get
+
+    token = os.getenv("IPINFO_TOKEN")
+    url = "https://ipinfo.io/json" + (f"?token={token}" if token else "")
+    response = get(url, deadline=deadline)
+    response.raise_for_status()
+    j = response.json()
+    if "loc" not in j:
+        raise ValueError("ipinfo response has no coordinates")
+    lat, lon = map(float, j["loc"].split(","))
+    return {
+        "lat": lat,
+        "lon": lon,
+        "ip": j.get("ip"),
+        "city": j.get("city"),
+        "region": j.get("region"),
+        "country": j.get("country"),
+        "fixed_at": time.time(),
+        "source": "ipinfo",
+    }
+
+
+def with_age(fix, now=None):
+    """Copy of a fix with its age and a readable fix time added"""
+    now = time.time() if now is None else now
+    location = dict(fix)
+    location["age_seconds"] = max(0.0, now - fix["fixed_at"])
+    location["timestamp"] = datetime.fromtimestamp(fix["fixed_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    return location
+
+
+def format_age(age_seconds):
+    """Short human-readable age for the SMS ("just now", "12 min old", "3 h old")"""
+    if age_seconds is None:
+        return "unavailable"
+    if age_seconds < 60:
+        return "just now"
+    if age_seconds < 3600:
+        return f"{age_seconds / 60:.0f} min old"
+    if age_seconds < 86400:
+        return f"{age_seconds / 3600:.0f} h old"
+    return f"{age_seconds / 86400:.0f} days old"
+
+
+class LocationProvider:
+    """
+    Keeps the last-known fix in memory and on disk, refreshing it in the background.
+
+    Args:
+        path (str): JSON file the last fix is persisted to
+        interval (float): Seconds between background refreshes
+        lookup (callable): Returns a fresh fix dict (defaults to lookup_location)
+    """
+
+    def __init__(self, path=LOCATION_CACHE_FILE, interval=LOCATION_REFRESH_INTERVAL, lookup=lookup_location):
+        self.path = path
+        self.interval = interval
+        self.lookup = lookup
+        self._fix = self._load()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                fix = json.load(f)
+            float(fix["lat"]), float(fix["lon"]), float(fix["fixed_at"])
+            return fix
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _persist(self, fix):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(fix, f)
+        os.replace(tmp_path, self.path)
+
+    def current(self):
+        """Last-known fix with its age, or None if there has never been one (memory read only)"""
+        fix = self._fix
+        return with_age(fix) if fix is not None else None
+
+    def update(self, fix):
+        """Store a fix taken elsewhere (e.g. a live lookup during an emergency)"""
+        with self._lock:
+            if self._fix is not None and fix["fixed_at"] < self._fix["fixed_at"]:
+                return
+            self._fix = fix
+            try:
+                self._persist(fix)
+            except OSError as e:
+                print(f"❌ Could not save location fix: {e}")
+
+    def refresh(self, deadline=LOCATION_LOOKUP_DEADLINE):
+        """Look the location up now; returns the new fix with its age or None on failure"""
+        try:
+            fix = self.lookup(deadline=deadline)
+        except Exception as e:
+            print(f"❌ Location refresh failed: {e}")
+            return None
+        self.update(fix)
+        return with_age(fix)
+
+    def start(self):
+        """Start the background refresh thread (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="location-refresh", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # A fix persisted by an earlier run counts towards the interval
+        fix = self._fix
+        wait = 0.0 if fix is None else max(0.0, fix["fixed_at"] + self.interval - time.time())
+        while not self._stop.wait(wait):
+            wait = self.interval if self.refresh() is not None else min(self.interval, LOCATION_RETRY_INTERVAL)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_location_provider(start=True):
+    """Shared provider; starts background refreshing on first use unless start=False"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = LocationProvider()
+    return _provider.start() if start else _provider
+
+
+if __name__ == "__main__":
+    provider = get_location_provider(start=False)
+    cached = provider.current()
+    print(f"💾 Last-known fix: {cached and (cached['city'], format_age(cached['age_seconds']))}")
+    start = time.perf_counter()
+    for _ in range(10000):
+        provider.current()
+    print(f"⏱️ Cached read: {(time.perf_counter() - start) / 10000 * 1e6:.1f} µs")
+    start = time.perf_counter()
+    fresh = provider.refresh()
+    print(f"🌐 Live lookup: {(time.perf_counter() - start) * 1000:.0f} ms -> {fresh and fresh['city']}")
@@ -9,24 +9,72 @@ This is the main dispatcher that routes EEG signals to specific workflows:
 4. STRESS_RELIEF - Calming music, breathing exercises, affirmations
 """
 
+import importlib
 import sys
+import threading
+import time
 from datetime import datetime
 
-# Direct imports from root level
-from emergency_workflow import emergency_workflow
-from snapshot_workflow import snapshot_workflow
-from messaging_workflow import send_message_workflow
-from stress_relief_workflow import stress_relief_workflow
-from text_to_speech import speak_text
+from event_log import log_event
+from speech_service import speak_async
 
-# Workflow mappings for EEG signal integration
+# Workflow mappings for EEG signal integration, as "module:function" strings.
+# A workflow's module (and the SDKs it uses) is imported the first time it runs,
+# so dispatching MESSAGE never loads the vision stack.
 WORKFLOWS = {
-    "EMERGENCY": emergency_workflow,
-    "SNAPSHOT": snapshot_workflow, 
-    "MESSAGE": send_message_workflow,
-    "STRESS_RELIEF": stress_relief_workflow
+    "EMERGENCY": "emergency_workflow:emergency_workflow",
+    "SNAPSHOT": "snapshot_workflow:snapshot_workflow",
+    "MESSAGE": "messaging_workflow:send_message_workflow",
+    "STRESS_RELIEF": "stress_relief_workflow:stress_relief_workflow"
 }
 
+# Fixed phrases spoken by the orchestrator itself
+ORCHESTRATOR_PROMPTS = [
+    "Unknown workflow requested",
+    *(f"Error occurred in {name} workflow" for name in WORKFLOWS),
+]
+
+_resolved = {}
+_resolve_lock = threading.Lock()
+
+def resolve_workflow(workflow_name):
+    """Import a workflow's module on first use and return its entry point"""
+    with _resolve_lock:
+        function = _resolved.get(workflow_name)
+        if function is None:
+            module_name, function_name = WORKFLOWS[workflow_name].split(":")
+            function = getattr(importlib.import_module(module_name), function_name)
+            _resolved[workflow_name] = function
+        return function
+
+def known_prompts(attribute="PROMPTS"):
+    """
+    Every fixed phrase spoken by the orchestrator and workflows
+
+    Imports the workflow modules to read their PROMPTS lists (phrases spoken
+    whole) or, with attribute="SENTENCE_PROMPTS", the phrases spoken sentence
+    by sentence; call it off the critical path (warm_up does so in a
+    background thread).
+    """
+    prompts = list(ORCHESTRATOR_PROMPTS) if attribute == "PROMPTS" else []
+    for target in WORKFLOWS.values():
+        module = importlib.import_module(target.split(":")[0])
+        prompts.extend(getattr(module, attribute, []))
+    return prompts
+
+def warm_up():
+    """Start location refreshing and pre-warm the TTS cache with every known fixed phrase in the background"""
+    def warm():
+        from location_provider import get_location_provider
+        get_location_provider()
+        from text_to_speech import prewarm_tts_cache
+        prewarm_tts_cache(known_prompts(), background=False)
+        prewarm_tts_cache(known_prompts("SENTENCE_PROMPTS"), background=False, sentences=True)
+
+    thread = threading.Thread(target=warm, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
 def main_orchestrator(workflow_name="SNAPSHOT"):
     """
     Main orchestrator function - routes to appropriate workflow
@@ -48,17 +96,17 @@ def main_orchestrator(workflow_name="SNAPSHOT"):
     if workflow_name not in WORKFLOWS:
         error_msg = f"❌ Unknown workflow: {workflow_name}. Available: {list(WORKFLOWS.keys())}"
         print(error_msg)
-        speak_text("Unknown workflow requested")
+        log_event("unknown_workflow", workflow_name)
+        speak_async("Unknown workflow requested")
         return None
     
     # Execute the requested workflow
+    started = time.perf_counter()
     try:
-        result = WORKFLOWS[workflow_name]()
+        result = resolve_workflow(workflow_name)()
         
         # Log workflow execution
-        log_entry = f"{timestamp}: Executed {workflow_name} workflow\n"
-        with open("workflow_log.txt", "a") as f:
-            f.write(log_entry)
+        log_event("workflow_completed", workflow_name, duration_ms=round((time.perf_counter() - started) * 1000, 1))
         
         print(f"\n✅ {workflow_name} workflow completed successfully!")
         return result
@@ -66,7 +114,10 @@ def main_orchestrator(workflow_name="SNAPSHOT"):
     except Exception as e:
         error_msg = f"❌ Error in {workflow_name} workflow: {e}"
         print(error_msg)
-        speak_text(f"Error occurred in {workflow_name} workflow")
+        log_event(
+            "workflow_failed", workflow_name, error=str(e), duration_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        speak_async(f"Error occurred in {workflow_name} workflow")
         return None
 
 def test_all_workflows():
@@ -110,6 +161,9 @@ if __name__ == "__main__":
         # Default workflow for testing
         workflow = "SNAPSHOT"  # Change this to test different workflows
     
+    # Synthesize fixed phrases in the background so they play instantly
+    warm_up()
+    
     # Special command to test all workflows
     if workflow == "TEST_ALL":
         test_all_workflows()
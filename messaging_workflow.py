@@ -1,12 +1,22 @@
 import os
-from datetime import datetime
 from dotenv import load_dotenv
-from text_to_speech import speak_text
-from twilio.rest import Client
+from event_log import log_event
+from sms_outbox import get_outbox
+from speech_service import speak_async
 
 # Load environment variables
 load_dotenv()
 
+DEFAULT_MESSAGE = "Hi! Just checking in. Hope you're doing well!"
+
+# Fixed phrases spoken by this workflow, pre-warmed in the TTS cache at startup
+PROMPTS = [
+    f"Sending message: {DEFAULT_MESSAGE}",
+    "Message queued and sending",
+    "Message sending failed",
+    "Message sending failed - credentials not configured",
+]
+
 def send_message_workflow(message_text=None):
     """Send a quick message to a specific contact"""
     
@@ -14,10 +24,10 @@ def send_message_workflow(message_text=None):
     
     # Default message if none provided
     if not message_text:
-        message_text = "Hi! Just checking in. Hope you're doing well!"
+        message_text = DEFAULT_MESSAGE
     
     # Speak what we're doing
-    speak_text(f"Sending message: {message_text}")
+    speak_async(f"Sending message: {message_text}")
     
     # Get credentials from environment variables
     account_sid = os.getenv("TWILIO_ACCOUNT_SID")
@@ -27,30 +37,22 @@ def send_message_workflow(message_text=None):
     
     if not all([account_sid, auth_token, from_number, target_contact]):
         print("❌ Twilio credentials not configured in environment variables")
-        speak_text("Message sending failed - credentials not configured")
+        speak_async("Message sending failed - credentials not configured")
         return None
     
-    client = Client(account_sid, auth_token)
-    
+    # Returns once the message is durably queued; the outbox sender delivers
+    # it and retries if Twilio or the network is down
+    queued = False
     try:
-        message = client.messages.create(
-            body=message_text,
-            from_=from_number,
-            to=target_contact
-        )
-        print(f"✅ Message sent to {target_contact}")
-        speak_text("Message sent successfully")
+        get_outbox().enqueue([target_contact], message_text, from_number)
+        queued = True
+        print(f"📤 Message to {target_contact} queued for sending")
+        speak_async("Message queued and sending")
     except Exception as e:
-        print(f"❌ Failed to send message: {e}")
-        speak_text("Message sending failed")
-    
-    
-    # Log message for now
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_file = "message_log.txt"
+        print(f"❌ Failed to queue message: {e}")
+        speak_async("Message sending failed")
     
-    with open(log_file, 'a') as f:
-        f.write(f"{timestamp}: {message_text}\n")
+    log_event("message_queued" if queued else "message_failed", "MESSAGE", to=target_contact, text=message_text)
     
     print(f"📱 Message logged: {message_text}")
     print("✅ Message workflow complete!")
@@ -0,0 +1,411 @@
+"""
+Resident orchestrator daemon.
+
+Running main_orchestrator.py once per EEG signal pays for interpreter start,
+imports and client construction on every trigger. The daemon does that work
+once: it imports every workflow, builds the API clients, opens a capture
+handle per worker thread and pre-warms the TTS cache, then accepts workflow
+triggers over a local Unix socket.
+
+Protocol: newline-delimited JSON on ORCHESTRATOR_SOCKET, one response line per
+request line.
+    -> {"workflow": "MESSAGE", "wait": false}
+    <- {"ok": true, "workflow": "MESSAGE", "accepted_ms": 0.2}
+    -> {"workflow": "SNAPSHOT", "wait": true}
+    <- {"ok": true, "workflow": "SNAPSHOT", "accepted_ms": 0.1, "started_ms": 0.3,
+        "duration_ms": 2140.5, "result": "..."}
+PING answers without running anything and STATS returns per-workflow counters.
+
+Usage:
+    python orchestrator_daemon.py serve [--workers 4] [--no-capture]
+    python orchestrator_daemon.py trigger SNAPSHOT [--wait]
+    python orchestrator_daemon.py loadtest --rate 50 --duration 10 [--workflow PING]
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import statistics
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ORCHESTRATOR_SOCKET = os.getenv("ORCHESTRATOR_SOCKET", "/tmp/glasses_orchestrator.sock")
+DAEMON_WORKERS = 4
+CONTROL_COMMANDS = ("PING", "STATS")
+# Hosts whose TCP + TLS connections are opened during warm-up
+WARM_URLS = ("https://api.twilio.com/", "https://ipinfo.io/")
+
+
+class WorkflowStats:
+    """Per-workflow trigger counts and latencies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+
+    def record(self, workflow_name, queued_ms, duration_ms, ok):
+        with self._lock:
+            entry = self._runs.setdefault(
+                workflow_name, {"runs": 0, "errors": 0, "queued_ms": [], "duration_ms": []}
+            )
+            entry["runs"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["queued_ms"].append(queued_ms)
+            entry["duration_ms"].append(duration_ms)
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: {
+                    "runs": entry["runs"],
+                    "errors": entry["errors"],
+                    "median_queued_ms": round(statistics.median(entry["queued_ms"]), 2),
+                    "median_duration_ms": round(statistics.median(entry["duration_ms"]), 1),
+                }
+                for name, entry in self._runs.items()
+            }
+
+
+class OrchestratorDaemon:
+    """
+    Warm workflow runner fed by socket triggers.
+
+    Args:
+        workers (int): Worker threads; each keeps its own capture handle open
+        warm_capture (bool): Open the screen capture handle in every worker at startup
+    """
+
+    def __init__(self, workers=DAEMON_WORKERS, warm_capture=True):
+        self.jobs = queue.Queue()
+        self.stats = WorkflowStats()
+        self.started = time.time()
+        self.warm_capture = warm_capture
+        self._workers = [
+            threading.Thread(target=self._work, name=f"workflow-{index}", daemon=True)
+            for index in range(workers)
+        ]
+
+    def warm_up(self):
+        """Import workflows, build API clients and pre-warm the TTS cache"""
+        import api_clients
+        import main_orchestrator
+        from speech_service import get_speech_service
+
+        start = time.perf_counter()
+        for workflow_name in main_orchestrator.WORKFLOWS:
+            try:
+                main_orchestrator.resolve_workflow(workflow_name)
+            except Exception as e:
+                print(f"❌ Could not load {workflow_name} workflow: {e}")
+
+        clients = {
+            "COHERE_API_KEY": api_clients.get_cohere_client,
+            "ELEVENLABS_API_KEY": api_clients.get_elevenlabs_client,
+            "GEMINI_API_KEY": api_clients.get_gemini_model,
+            "TWILIO_AUTH_TOKEN": api_clients.get_twilio_client,
+        }
+        for variable, getter in clients.items():
+            if not os.getenv(variable):
+                continue
+            try:
+                getter()
+            except Exception as e:
+                print(f"❌ Could not create {getter.__name__[4:]}: {e}")
+
+        try:
+            from http_pool import warm_connections
+
+            warm_connections(WARM_URLS)
+        except Exception as e:
+            print(f"❌ Could not pre-connect HTTP pool: {e}")
+
+        try:
+            from vision_providers import get_vision_router
+
+            get_vision_router()
+        except Exception as e:
+            print(f"❌ Could not set up vision providers: {e}")
+
+        if os.getenv("TWILIO_AUTH_TOKEN"):
+            # Also starts sending anything left queued by an earlier run
+            from sms_outbox import get_outbox
+
+            get_outbox()
+
+        get_speech_service()
+        main_orchestrator.warm_up()
+        if self.warm_capture:
+            from emergency_workflow import warm_up_capture
+
+            warm_up_capture()
+        for worker in self._workers:
+            worker.start()
+        print(f"🔥 Daemon warm in {time.perf_counter() - start:.2f}s ({len(self._workers)} workers)")
+
+    def _work(self):
+        if self.warm_capture:
+            try:
+                from capture_service import warm_up
+
+                warm_up()
+            except Exception as e:
+                print(f"❌ Could not open capture in {threading.current_thread().name}: {e}")
+
+        from main_orchestrator import main_orchestrator
+
+        while True:
+            workflow_name, received, reply = self.jobs.get()
+            started = time.perf_counter()
+            ok = True
+            try:
+                result = main_orchestrator(workflow_name)
+            except Exception as e:
+                ok, result = False, str(e)
+            finished = time.perf_counter()
+            queued_ms = (started - received) * 1000
+            duration_ms = (finished - started) * 1000
+            self.stats.record(workflow_name, queued_ms, duration_ms, ok)
+            if reply is not None:
+                reply.put(
+                    {
+                        "ok": ok and result is not None,
+                        "started_ms": round(queued_ms, 2),
+                        "duration_ms": round(duration_ms, 1),
+                        "result": result,
+                    }
+                )
+
+    def handle(self, request):
+        """Handle one decoded request and return the response dict"""
+        received = time.perf_counter()
+        workflow_name = str(request.get("workflow", "")).upper()
+
+        if workflow_name == "PING":
+            return {"ok": True, "workflow": "PING", "uptime_s": round(time.time() - self.started, 1)}
+        if workflow_name == "STATS":
+            return {
+                "ok": True,
+                "workflow": "STATS",
+                "stats": self.stats.summary(),
+                "queued": self.jobs.qsize(),
+                "caches": cache_stats(),
+                "sms_outbox": outbox_stats(),
+            }
+
+        from main_orchestrator import WORKFLOWS
+
+        if workflow_name not in WORKFLOWS:
+            return {"ok": False, "error": f"Unknown workflow: {workflow_name}", "available": list(WORKFLOWS)}
+
+        reply = queue.Queue(maxsize=1) if request.get("wait") else None
+        self.jobs.put((workflow_name, received, reply))
+        response = {
+            "ok": True,
+            "workflow": workflow_name,
+            "accepted_ms": round((time.perf_counter() - received) * 1000, 3),
+        }
+        if reply is not None:
+            response.update(reply.get())
+        return response
+
+
+def cache_stats():
+    """Hit/miss counters of the snapshot answer cache and the TTS audio cache"""
+    import snapshot_workflow
+    import text_to_speech
+
+    return {
+        "snapshot_answers": snapshot_workflow.answer_cache.stats(),
+        "tts_audio": text_to_speech.tts_cache.stats(),
+    }
+
+
+def outbox_stats():
+    """Outbox record counts by state, if the outbox is in use"""
+    import sms_outbox
+
+    return sms_outbox._outbox.stats() if sms_outbox._outbox is not None else None
+
+
+class TriggerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if isinstance(request, dict):
+                    response = self.server.daemon.handle(request)
+                else:
+                    response = {"ok": False, "error": "Request must be a JSON object"}
+            except json.JSONDecodeError as e:
+                response = {"ok": False, "error": f"Invalid JSON: {e}"}
+            except Exception as e:
+                # One bad request must not take the connection down with it
+                print(f"❌ Error handling request: {e}")
+                response = {"ok": False, "error": f"Internal error: {e}"}
+            try:
+                self.wfile.write((json.dumps(response, default=str) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                return
+
+
+class TriggerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, daemon):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.daemon = daemon
+        super().__init__(path, TriggerHandler)
+
+
+def serve(socket_path=ORCHESTRATOR_SOCKET, workers=DAEMON_WORKERS, warm_capture=True):
+    """Warm everything up and serve triggers until interrupted"""
+    daemon = OrchestratorDaemon(workers, warm_capture)
+    daemon.warm_up()
+    server = TriggerServer(socket_path, daemon)
+    print(f"🧠 Orchestrator daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping orchestrator daemon")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class DaemonClient:
+    """Persistent connection to a running daemon"""
+
+    def __init__(self, socket_path=ORCHESTRATOR_SOCKET, timeout=60):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile("rwb")
+
+    def request(self, workflow_name, wait=False):
+        self._file.write((json.dumps({"workflow": workflow_name, "wait": wait}) + "\n").encode("utf-8"))
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Orchestrator daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+def trigger(workflow_name, wait=False, socket_path=ORCHESTRATOR_SOCKET, timeout=60):
+    """
+    Send one workflow trigger to the daemon (e.g. from the Crown EEG handler)
+
+    Args:
+        workflow_name (str): One of the orchestrator workflows, or PING/STATS
+        wait (bool): Block until the workflow finishes and include its result
+    """
+    client = DaemonClient(socket_path, timeout)
+    try:
+        return client.request(workflow_name, wait)
+    finally:
+        client.close()
+
+
+def load_test(rate, duration, workflow_name="PING", wait=False, socket_path=ORCHESTRATOR_SOCKET):
+    """
+    Fire triggers at a fixed rate and report round-trip latency percentiles
+
+    Requests are sent open-loop: each one goes out on schedule from its own
+    thread, so a slow response does not hide queueing delay.
+    """
+    interval = 1.0 / rate
+    total = int(rate * duration)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def fire():
+        client = getattr(local, "client", None)
+        start = time.perf_counter()
+        try:
+            if client is None:
+                client = local.client = DaemonClient(socket_path)
+            response = client.request(workflow_name, wait)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if response.get("ok"):
+                    latencies.append(elapsed)
+                else:
+                    errors.append(response.get("error", "workflow failed"))
+        except Exception as e:
+            local.client = None
+            with lock:
+                errors.append(str(e))
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    print(f"🔥 Load test: {workflow_name} at {rate}/s for {duration}s ({total} triggers, wait={wait})")
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        for index in range(total):
+            delay = began + index * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire)
+    elapsed = time.perf_counter() - began
+
+    print(f"  sent {total} in {elapsed:.2f}s ({total / elapsed:.1f}/s), {len(errors)} errors")
+    if latencies:
+        latencies.sort()
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+        print(
+            f"  latency ms: p50 {percentile(50):.2f} | p95 {percentile(95):.2f} | "
+            f"p99 {percentile(99):.2f} | max {latencies[-1]:.2f}"
+        )
+    if errors:
+        print(f"  first error: {errors[0]}")
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident orchestrator daemon")
+    parser.add_argument("--socket", default=ORCHESTRATOR_SOCKET, help="Unix socket path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the daemon")
+    serve_parser.add_argument("--workers", type=int, default=DAEMON_WORKERS, help="Workflow worker threads")
+    serve_parser.add_argument("--no-capture", action="store_true", help="Do not open capture handles at startup")
+
+    trigger_parser = commands.add_parser("trigger", help="Send one workflow trigger")
+    trigger_parser.add_argument("workflow", help="Workflow name, PING or STATS")
+    trigger_parser.add_argument("--wait", action="store_true", help="Wait for the workflow result")
+
+    load_parser = commands.add_parser("loadtest", help="Fire triggers at a fixed rate")
+    load_parser.add_argument("--rate", type=float, default=20, help="Triggers per second")
+    load_parser.add_argument("--duration", type=float, default=5, help="Seconds to run")
+    load_parser.add_argument("--workflow", default="PING", help="Workflow to trigger (PING has no side effects)")
+    load_parser.add_argument("--wait", action="store_true", help="Wait for each workflow to finish")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.socket, args.workers, not args.no_capture)
+    elif args.command == "trigger":
+        print(json.dumps(trigger(args.workflow.upper(), args.wait, args.socket), indent=2, default=str))
+    else:
+        load_test(args.rate, args.duration, args.workflow.upper(), args.wait, args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Fast in-place overlay renderer for detections.
+
+results[0].plot() allocates a fresh annotated copy of every frame and
+re-rasterizes every label with putText. OverlayRenderer draws straight onto
+the captured buffer from the raw xyxy/conf/cls arrays instead: box outlines
+are plain cv2.rectangle calls and label text (class names, confidences,
+track IDs) is rasterized once into small cached patches that are blitted on
+later frames. The HUD is a single line drawn once per frame.
+"""
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.45
+LABEL_THICKNESS = 1
+HUD_SCALE = 0.5
+MAX_CACHED_PATCHES = 2048
+
+
+def class_color(class_id):
+    """Stable, well-spread BGR color for a class id"""
+    hue = (int(class_id) * 47) % 180
+    hsv = np.uint8([[[hue, 200, 255]]])
+    return tuple(int(c) for c in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0])
+
+
+class OverlayRenderer:
+    """
+    Draw boxes and labels in place on BGR frames.
+
+    Args:
+        names (dict): Class id -> class name, as exposed by the detector
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self._patches = {}
+        self._colors = {}
+
+    def _color(self, class_id):
+        color = self._colors.get(class_id)
+        if color is None:
+            color = self._colors[class_id] = class_color(class_id)
+        return color
+
+    def _patch(self, text, background):
+        """Pre-rendered label patch with white text on a solid background"""
+        key = (text, background)
+        patch = self._patches.get(key)
+        if patch is None:
+            if len(self._patches) >= MAX_CACHED_PATCHES:
+                self._patches.clear()
+            (width, height), baseline = cv2.getTextSize(text, FONT, LABEL_SCALE, LABEL_THICKNESS)
+            patch = np.empty((height + baseline + 4, width + 4, 3), dtype=np.uint8)
+            patch[:] = background
+            cv2.putText(
+                patch,
+                text,
+                (2, height + 2),
+                FONT,
+                LABEL_SCALE,
+                (255, 255, 255),
+                LABEL_THICKNESS,
+                cv2.LINE_AA,
+            )
+            self._patches[key] = patch
+        return patch
+
+    @staticmethod
+    def _blit(frame, patch, x, y):
+        """Copy patch into frame with its top-left at (x, y), clipped to the frame"""
+        frame_height, frame_width = frame.shape[:2]
+        height, width = patch.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + width, frame_width), min(y + height, frame_height)
+        if x1 > x0 and y1 > y0:
+            frame[y0:y1, x0:x1] = patch[y0 - y : y1 - y, x0 - x : x1 - x]
+        return x1
+
+    def draw(self, frame, xyxy, conf, cls, track_ids=None):
+        """Draw every box with its class name, confidence and optional track id"""
+        boxes = np.asarray(xyxy).astype(np.int32, copy=False)
+        for index in range(len(boxes)):
+            x1, y1, x2, y2 = boxes[index]
+            class_id = int(cls[index])
+            color = self._color(class_id)
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+
+            name_patch = self._patch(str(self.names.get(class_id, class_id)), color)
+            label_y = int(y1) - name_patch.shape[0]
+            if label_y < 0:
+                label_y = int(y1)
+            x = int(x1)
+            if track_ids is not None:
+                x = self._blit(frame, self._patch(f"#{track_ids[index]}", (40, 40, 40)), x, label_y)
+            x = self._blit(frame, name_patch, x, label_y)
+            self._blit(frame, self._patch(f"{float(conf[index]):.2f}", (40, 40, 40)), x, label_y)
+        return frame
+
+    def draw_detections(self, frame, detections):
+        return self.draw(frame, detections.xyxy, detections.conf, detections.cls)
+
+    def draw_tracks(self, frame, tracked):
+        """Draw (track, box) pairs from BoxTracker with their track IDs"""
+        if not tracked:
+            return frame
+        tracks = [track for track, _ in tracked]
+        return self.draw(
+            frame,
+            np.stack([box for _, box in tracked]),
+            [track.conf for track in tracks],
+            [track.cls for track in tracks],
+            track_ids=[track.id for track in tracks],
+        )
+
+
+def draw_hud(frame, text):
+    """Draw the one-line HUD (FPS and stage timings) once per frame"""
+    (width, height), baseline = cv2.getTextSize(text, FONT, HUD_SCALE, 1)
+    cv2.rectangle(frame, (0, 0), (width + 10, height + baseline + 10), (0, 0, 0), -1)
+    cv2.putText(frame, text, (5, height + 5), FONT, HUD_SCALE, (0, 255, 0), 1, cv2.LINE_AA)
+    return frame
+
+
+def benchmark_overlay(iterations=200, boxes=12, width=400, height=600):
+    """Compare OverlayRenderer against ultralytics Results.plot() on the same boxes"""
+    import time
+
+    from frame_source import SyntheticFrameSource
+
+    rng = np.random.default_rng(0)
+    names = {index: f"class_{index}" for index in range(80)}
+    top_left = rng.uniform([0, 0], [width - 60, height - 60], size=(boxes, 2))
+    xyxy = np.concatenate([top_left, top_left + rng.uniform(20, 60, size=(boxes, 2))], axis=1)
+    conf = rng.uniform(0.4, 1.0, size=boxes).astype(np.float32)
+    cls = rng.integers(0, 80, size=boxes)
+
+    source = SyntheticFrameSource(width, height)
+    frame = source.read()
+    scratch = np.empty_like(frame)
+    renderer = OverlayRenderer(names)
+
+    def timed(label, draw):
+        for _ in range(5):
+            draw()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            draw()
+        per_frame = (time.perf_counter() - start) / iterations * 1000
+        print(f"  {label:<28} {per_frame:.3f} ms/frame")
+        return per_frame
+
+    def overlay():
+        # Stands in for the next captured frame landing in the reused buffer
+        np.copyto(scratch, frame)
+        renderer.draw(scratch, xyxy, conf, cls)
+        draw_hud(scratch, "FPS 30 | cap 3ms | inf 45ms")
+
+    print(f"⏱️ Overlay benchmark: {boxes} boxes on {width}x{height}, {iterations} iterations")
+    fast = timed("OverlayRenderer (in place)", overlay)
+
+    try:
+        import torch
+        from ultralytics.engine.results import Results
+    except ImportError:
+        print("  ultralytics not installed; skipping Results.plot() comparison")
+        return
+
+    data = torch.tensor(np.concatenate([xyxy, conf[:, None], cls[:, None]], axis=1))
+    result = Results(orig_img=frame, path="", names=names, boxes=data)
+
+    def plot():
+        annotated = result.plot()
+        for line, y in (("FPS: 30", 30), ("Capture: 0.003s", 60), ("Inference: 0.045s", 90)):
+            cv2.putText(annotated, line, (10, y), FONT, 0.7, (255, 0, 0), 2)
+
+    slow = timed("Results.plot() + 3 putText", plot)
+    print(f"  speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark_overlay()
@@ -0,0 +1,306 @@
+"""
+Opt-in INT8 detector: static quantization of the ONNX export plus an
+accuracy/latency harness.
+
+Quantization is calibrated on recorded glasses frames (an image directory or
+a video file readable by frame_source) so activation ranges match what the
+detector actually sees. The detection head (model.22) stays in float because
+box regression loses most of the accuracy when quantized.
+
+Usage:
+    python quantize_detector.py quantize --calibration recordings/ --frames 200
+    python quantize_detector.py evaluate --data labeled/ --backends onnx,onnx-int8
+
+The labeled set uses the YOLO layout: images/ and labels/ subdirectories (or
+images with .txt labels side by side), one "class cx cy w h" line per box in
+normalized coordinates.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from detector_backends import (
+    MODEL_CACHE_DIR,
+    MODEL_PATH,
+    ExportedDetector,
+    export_model,
+    load_detector,
+)
+from frame_source import IMAGE_EXTENSIONS, open_frame_source
+
+CALIBRATION_SOURCE = os.getenv("CALIBRATION_SOURCE", "calibration")
+CALIBRATION_FRAMES = 200
+# Detect head of YOLOv8; quantizing its box decoding costs most of the mAP
+EXCLUDED_NODE_PREFIXES = ("/model.22/",)
+
+
+def quantized_model_path(model_path=MODEL_PATH, cache_dir=MODEL_CACHE_DIR):
+    fp32_path = export_model("onnx", model_path, cache_dir=cache_dir)
+    return fp32_path.with_name(f"{fp32_path.stem}_int8.onnx")
+
+
+class FrameCalibrationReader:
+    """Feeds letterboxed calibration frames to onnxruntime's calibrator (get_next/rewind protocol)"""
+
+    def __init__(self, source_spec, input_name, limit=CALIBRATION_FRAMES):
+        self.source_spec = source_spec
+        self.input_name = input_name
+        self.limit = limit
+        self._letterbox = ExportedDetector(dynamic=True)
+        self._frames = None
+
+    def _iter_tensors(self):
+        with open_frame_source(self.source_spec) as source:
+            # Image directories loop by default, so stop after one pass
+            if hasattr(source, "loop"):
+                source.loop = False
+            for _ in range(self.limit):
+                frame = source.read()
+                if frame is None:
+                    return
+                tensor, *_ = self._letterbox._preprocess(frame)
+                yield {self.input_name: tensor.copy()}
+
+    def get_next(self):
+        if self._frames is None:
+            self._frames = self._iter_tensors()
+        return next(self._frames, None)
+
+    def rewind(self):
+        self._frames = None
+
+
+def quantize_model(calibration=CALIBRATION_SOURCE, model_path=MODEL_PATH, limit=CALIBRATION_FRAMES):
+    """Statically quantize the cached ONNX export to INT8 and return the new path"""
+    try:
+        import onnx
+        from onnxruntime.quantization import (
+            CalibrationMethod,
+            QuantFormat,
+            QuantType,
+            quantize_static,
+        )
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+    except ImportError as e:
+        raise RuntimeError("onnxruntime and onnx are required for INT8 quantization") from e
+
+    if not Path(calibration).exists():
+        raise RuntimeError(
+            f"Calibration frames not found at {calibration}. "
+            "Record some glasses frames into an image directory or video first."
+        )
+
+    fp32_path = export_model("onnx", model_path)
+    int8_path = quantized_model_path(model_path)
+    prepared_path = fp32_path.with_name(f"{fp32_path.stem}_prepared.onnx")
+
+    print(f"🧮 Preparing {fp32_path} for quantization...", file=sys.stderr)
+    # Symbolic shape inference cannot resolve the dynamic H/W axes, ONNX shape inference is enough
+    quant_pre_process(str(fp32_path), str(prepared_path), skip_symbolic_shape=True)
+
+    model = onnx.load(str(prepared_path))
+    input_name = model.graph.input[0].name
+    excluded = [
+        node.name for node in model.graph.node if node.name.startswith(EXCLUDED_NODE_PREFIXES)
+    ]
+
+    reader = FrameCalibrationReader(calibration, input_name, limit)
+    print(f"🧮 Calibrating on up to {limit} frames from {calibration}...", file=sys.stderr)
+    start = time.perf_counter()
+    quantize_static(
+        str(prepared_path),
+        str(int8_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        nodes_to_exclude=excluded,
+    )
+    prepared_path.unlink(missing_ok=True)
+    print(f"✅ INT8 model saved to {int8_path} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+    return int8_path
+
+
+def quantized_model(model_path=MODEL_PATH, calibration=CALIBRATION_SOURCE):
+    """Return the cached INT8 model, quantizing it on first use"""
+    int8_path = quantized_model_path(model_path)
+    if int8_path.exists():
+        return int8_path
+    return quantize_model(calibration, model_path)
+
+
+def load_labeled_set(data_dir):
+    """Return [(image_path, gt_boxes_xyxy_normalized, gt_classes)] for a YOLO-layout directory"""
+    data_dir = Path(data_dir)
+    image_dir = data_dir / "images" if (data_dir / "images").is_dir() else data_dir
+    label_dir = data_dir / "labels" if (data_dir / "labels").is_dir() else image_dir
+
+    samples = []
+    for image_path in sorted(image_dir.iterdir()):
+        if image_path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        label_path = label_dir / f"{image_path.stem}.txt"
+        rows = []
+        if label_path.exists():
+            rows = [line.split() for line in label_path.read_text().splitlines() if line.strip()]
+        labels = np.array(rows, dtype=np.float32).reshape(-1, 5)
+        cx, cy, w, h = labels[:, 1], labels[:, 2], labels[:, 3], labels[:, 4]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        samples.append((image_path, boxes, labels[:, 0].astype(np.int64)))
+    return samples
+
+
+def average_precision(recall, precision):
+    """Area under the precision/recall curve with all-point interpolation"""
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    changes = np.where(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[changes + 1] - recall[changes]) * precision[changes + 1]))
+
+
+def mean_average_precision(predictions, ground_truth, iou_threshold):
+    """
+    mAP over the classes present in the ground truth.
+
+    Args:
+        predictions (list): Per image (xyxy, conf, cls) in pixels
+        ground_truth (list): Per image (xyxy, cls) in pixels
+    """
+    from tracker import box_iou
+
+    classes = np.unique(np.concatenate([cls for _, cls in ground_truth] or [np.zeros(0)]))
+    aps = []
+    for class_id in classes:
+        scores, hits = [], []
+        total_gt = 0
+        for (pred_boxes, pred_conf, pred_cls), (gt_boxes, gt_cls) in zip(predictions, ground_truth):
+            gt = gt_boxes[gt_cls == class_id]
+            total_gt += len(gt)
+            mask = pred_cls == class_id
+            boxes, conf = pred_boxes[mask], pred_conf[mask]
+            order = np.argsort(-conf)
+            boxes, conf = boxes[order], conf[order]
+            matched = np.zeros(len(gt), dtype=bool)
+            iou = box_iou(boxes, gt) if len(gt) and len(boxes) else np.zeros((len(boxes), 0))
+            for index in range(len(boxes)):
+                scores.append(conf[index])
+                best = int(iou[index].argmax()) if iou.shape[1] else -1
+                if best >= 0 and iou[index, best] >= iou_threshold and not matched[best]:
+                    matched[best] = True
+                    hits.append(1)
+                else:
+                    hits.append(0)
+        if total_gt == 0:
+            continue
+        order = np.argsort(-np.array(scores))
+        true_positives = np.cumsum(np.array(hits)[order]) if hits else np.zeros(0)
+        recall = true_positives / total_gt
+        precision = true_positives / np.arange(1, len(true_positives) + 1)
+        aps.append(average_precision(recall, precision))
+    return float(np.mean(aps)) if aps else 0.0
+
+
+def evaluate_backend(backend, data_dir, model_path=MODEL_PATH, threads=None, conf=0.001):
+    """
+    Run one backend over the labeled set and return accuracy, latency and memory stats.
+
+    Meant to run in a fresh process so RSS only reflects this backend.
+    """
+    import cv2
+    import psutil
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    detector = load_detector(backend, model_path, threads=threads, device="cpu", conf=conf)
+    if detector.name != backend:
+        return {"backend": backend, "error": f"fell back to {detector.name}"}
+
+    samples = load_labeled_set(data_dir)
+    predictions, ground_truth, latencies = [], [], []
+    peak_rss = process.memory_info().rss
+    for image_path, boxes, classes in samples:
+        frame = cv2.imread(str(image_path))
+        height, width = frame.shape[:2]
+        start = time.perf_counter()
+        detections = detector.detect(frame)
+        latencies.append(time.perf_counter() - start)
+        peak_rss = max(peak_rss, process.memory_info().rss)
+        predictions.append((detections.xyxy, detections.conf, detections.cls))
+        ground_truth.append((boxes * (width, height, width, height), classes))
+
+    latencies = np.array(latencies[1:] or latencies) * 1000
+    return {
+        "backend": backend,
+        "images": len(samples),
+        "map50": mean_average_precision(predictions, ground_truth, 0.5),
+        "map50_95": float(
+            np.mean(
+                [
+                    mean_average_precision(predictions, ground_truth, threshold)
+                    for threshold in np.arange(0.5, 0.96, 0.05)
+                ]
+            )
+        ),
+        "latency_mean_ms": float(latencies.mean()),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "rss_mb": peak_rss / 2**20,
+        "model_rss_mb": (peak_rss - rss_before) / 2**20,
+    }
+
+
+def compare_backends(backends, data_dir, model_path=MODEL_PATH, threads=None):
+    """Evaluate each backend in its own process and print an accuracy/latency/RSS table"""
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            reports.append(
+                pool.submit(evaluate_backend, backend, data_dir, model_path, threads).result()
+            )
+
+    print(f"\n📊 Detector comparison on {data_dir}")
+    print(f"  {'backend':<10} {'mAP50':>7} {'mAP50-95':>9} {'mean ms':>8} {'p95 ms':>7} {'RSS MB':>7} {'model MB':>9}")
+    for report in reports:
+        if "error" in report:
+            print(f"  {report['backend']:<10} skipped ({report['error']})")
+            continue
+        print(
+            f"  {report['backend']:<10} {report['map50']:>7.3f} {report['map50_95']:>9.3f} "
+            f"{report['latency_mean_ms']:>8.1f} {report['latency_p95_ms']:>7.1f} "
+            f"{report['rss_mb']:>7.0f} {report['model_rss_mb']:>9.0f}"
+        )
+    return reports
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="INT8 quantization and accuracy/latency report")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    quantize_parser = subparsers.add_parser("quantize", help="build the INT8 model from recorded frames")
+    quantize_parser.add_argument("--calibration", default=CALIBRATION_SOURCE)
+    quantize_parser.add_argument("--frames", type=int, default=CALIBRATION_FRAMES)
+    quantize_parser.add_argument("--model", default=MODEL_PATH)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="compare mAP, latency and RSS")
+    evaluate_parser.add_argument("--data", required=True)
+    evaluate_parser.add_argument("--backends", default="onnx,onnx-int8")
+    evaluate_parser.add_argument("--threads", type=int, default=None)
+    evaluate_parser.add_argument("--model", default=MODEL_PATH)
+
+    args = parser.parse_args()
+    if args.command == "quantize":
+        quantize_model(args.calibration, args.model, args.frames)
+    else:
+        compare_backends(args.backends.split(","), args.data, args.model, args.threads)
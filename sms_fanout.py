@@ -0,0 +1,304 @@
+"""
+Concurrent SMS fan-out to several emergency contacts.
+
+Sending one SOS after another makes the last contact wait for every send
+before theirs. Here the message body is built once and every recipient is
+sent to at the same time on a bounded, shared worker pool. Total fan-out time
+therefore stays close to one send. Each recipient gets its own status with
+the number of attempts, the message SID or the error. Transient failures
+(Twilio 429/5xx answers, connections that could not be opened) are retried
+with backoff as long as the deadline allows. Anything else, such as an
+invalid number, fails that recipient right away.
+
+Contacts come from EMERGENCY_CONTACTS (comma separated) or
+EMERGENCY_CONTACTS_FILE (one number per line, # comments), falling back to the
+single EMERGENCY_CONTACT.
+
+The Twilio client is passed in, so the fan-out runs the same against
+FakeTwilioClient, a local stand-in with configurable latency and failures:
+    python sms_fanout.py [--contacts 5] [--latency-ms 400] [--failure-rate 0.2]
+"""
+
+import copy
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SMS_FANOUT_WORKERS = int(os.getenv("SMS_FANOUT_WORKERS", "8"))
+SMS_RETRIES = 2
+SMS_BACKOFF = 0.25
+SMS_FANOUT_DEADLINE = 9.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=SMS_FANOUT_WORKERS, thread_name_prefix="sms-fanout")
+        return _pool
+
+
+def emergency_contacts():
+    """Phone numbers to alert, without duplicates, in configured order"""
+    contacts = []
+    contacts_file = os.getenv("EMERGENCY_CONTACTS_FILE")
+    if contacts_file and os.path.exists(contacts_file):
+        with open(contacts_file) as f:
+            contacts.extend(line.split("#", 1)[0] for line in f)
+    contacts.extend(os.getenv("EMERGENCY_CONTACTS", "").split(","))
+    if not any(contact.strip() for contact in contacts):
+        contacts.append(os.getenv("EMERGENCY_CONTACT", ""))
+    return list(dict.fromkeys(contact.strip() for contact in contacts if contact.strip()))
+
+
+def is_transient(error):
+    """Whether a send error is worth retrying without risking a duplicate text"""
+    import requests
+    from urllib3.exceptions import ConnectTimeoutError
+
+    status = getattr(error, "status", None)
+    if status in RETRY_STATUSES:
+        return True
+    # Only a connection that never opened is known not to have reached Twilio;
+    # "Connection aborted" or a read timeout may come after the request was sent
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError):
+        # Refused or unresolvable: urllib3's NewConnectionError is a ConnectTimeoutError
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, ConnectTimeoutError)
+    return False
+
+
+def is_ambiguous(error):
+    """Whether a failed send may still have reached Twilio (read timeout, aborted connection)"""
+    import requests
+
+    return not is_transient(error) and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class DeliveryStatus:
+    """Outcome of the send to one recipient"""
+
+    def __init__(self, to):
+        self.to = to
+        self.state = "pending"
+        self.sid = None
+        self.attempts = 0
+        self.error = None
+        # Whether the last failure was transient (worth retrying later)
+        self.transient = False
+        # Whether the last failure left it unknown if Twilio got the request
+        self.ambiguous = False
+        self.elapsed = None
+
+    @property
+    def delivered(self):
+        return self.state == "sent"
+
+    def as_dict(self):
+        return {
+            "to": self.to,
+            "state": self.state,
+            "sid": self.sid,
+            "attempts": self.attempts,
+            "error": self.error,
+            "elapsed_ms": round(self.elapsed * 1000, 1) if self.elapsed is not None else None,
+        }
+
+
+class FanoutResult:
+    """Per-recipient statuses of one fan-out; truthy if any recipient got the message"""
+
+    def __init__(self, statuses, elapsed):
+        self.statuses = statuses
+        self.elapsed = elapsed
+
+    @property
+    def sent(self):
+        return [status for status in self.statuses if status.delivered]
+
+    @property
+    def failed(self):
+        return [status for status in self.statuses if not status.delivered]
+
+    def __bool__(self):
+        return bool(self.sent)
+
+    def as_dicts(self):
+        return [status.as_dict() for status in self.statuses]
+
+
+def send_one(client, status, body, from_number, give_up_at, retries=0, backoff=SMS_BACKOFF):
+    """Send to status.to, retrying transient failures until give_up_at; fills in and returns status"""
+    started = time.perf_counter()
+    delay = backoff
+    while True:
+        status.attempts += 1
+        try:
+            message = client.messages.create(body=body, from_=from_number, to=status.to)
+            status.sid = getattr(message, "sid", None)
+            status.state = "sent"
+            status.error = None
+            status.transient = False
+            status.ambiguous = False
+            break
+        except Exception as e:
+            status.error = str(e)
+            status.transient = is_transient(e)
+            status.ambiguous = is_ambiguous(e)
+            retryable = status.transient and status.attempts <= retries
+            if not retryable or time.monotonic() + delay >= give_up_at:
+                status.state = "failed"
+                break
+            time.sleep(delay)
+            delay *= 2
+    status.elapsed = time.perf_counter() - started
+    return status
+
+
+def send_batch(client, messages, deadline=SMS_FANOUT_DEADLINE, retries=SMS_RETRIES, backoff=SMS_BACKOFF, pool=None):
+    """
+    Send several messages concurrently, each to its own recipient.
+
+    Args:
+        client: Twilio client (or any object with messages.create(body, from_, to))
+        messages (list): (to, body, from_number) tuples
+        deadline (float): Seconds to wait for all sends; unfinished ones are reported as "timeout"
+        retries (int): Extra attempts per recipient after a transient failure
+        backoff (float): First retry delay in seconds; doubles on each retry
+        pool (Executor): Worker pool to send on (defaults to the shared bounded pool)
+
+    Returns:
+        FanoutResult: Per-message statuses in message order
+    """
+    started = time.perf_counter()
+    give_up_at = time.monotonic() + deadline
+    pool = pool or _get_pool()
+    statuses = [DeliveryStatus(to) for to, _, _ in messages]
+    try:
+        futures = [
+            pool.submit(send_one, client, status, body, from_number, give_up_at, retries, backoff)
+            for status, (_, body, from_number) in zip(statuses, messages)
+        ]
+    except RuntimeError:
+        # The interpreter is exiting and executors refuse new work; send one by one
+        for status, (_, body, from_number) in zip(statuses, messages):
+            if status.state == "pending":
+                send_one(client, status, body, from_number, give_up_at, retries, backoff)
+        return FanoutResult(statuses, time.perf_counter() - started)
+    wait(futures, timeout=deadline)
+    # Late workers keep writing to their own status; the result holds a copy
+    # finalized now, so a reported "timeout" cannot later turn into "sent"
+    results = []
+    for status, future in zip(statuses, futures):
+        if not future.done():
+            status = copy.copy(status)
+            status.state = "timeout"
+            # The request may still reach Twilio after this
+            status.error = f"no answer within {deadline:g}s"
+            status.ambiguous = True
+            status.elapsed = time.perf_counter() - started
+        results.append(status)
+    return FanoutResult(results, time.perf_counter() - started)
+
+
+def send_fanout(client, body, from_number, recipients, deadline=SMS_FANOUT_DEADLINE, retries=SMS_RETRIES, backoff=SMS_BACKOFF, pool=None):
+    """
+    Send the same body to every recipient concurrently (see send_batch).
+
+    Returns:
+        FanoutResult: Per-recipient statuses in recipient order
+    """
+    messages = [(to, body, from_number) for to in recipients]
+    return send_batch(client, messages, deadline, retries, backoff, pool)
+
+
+class FakeTwilioError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class FakeMessage:
+    def __init__(self, sid, to, body):
+        self.sid = sid
+        self.to = to
+        self.body = body
+
+
+class FakeTwilioClient:
+    """
+    Local Twilio stand-in: client.messages.create sleeps for a simulated API
+    round trip and fails transiently at failure_rate.
+
+    Args:
+        latency (float): Seconds per create call
+        failure_rate (float): Chance of a 503 per call
+        invalid_numbers (set): Numbers answered with a permanent 400
+        seed (int): Random seed for repeatable failures
+    """
+
+    def __init__(self, latency=0.4, failure_rate=0.0, invalid_numbers=(), seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.invalid_numbers = set(invalid_numbers)
+        self.sent = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.messages = self
+
+    def create(self, body, from_, to):
+        time.sleep(self.latency)
+        if to in self.invalid_numbers:
+            raise FakeTwilioError(400, f"The 'To' number {to} is not a valid phone number")
+        with self._lock:
+            if self._random.random() < self.failure_rate:
+                raise FakeTwilioError(503, "Service unavailable")
+            message = FakeMessage(f"SM{len(self.sent):032d}", to, body)
+            self.sent.append(message)
+        return message
+
+
+def benchmark_fanout(contacts=5, latency=0.4, failure_rate=0.2, seed=7):
+    """Compare serial sends with the concurrent fan-out on the local stand-in"""
+    recipients = [f"+1555010{index:04d}" for index in range(contacts)]
+    body = "🚨 EMERGENCY SOS 🚨 (fan-out benchmark)"
+
+    serial_client = FakeTwilioClient(latency, failure_rate, seed=seed)
+    start = time.perf_counter()
+    serial_statuses = [
+        send_one(serial_client, DeliveryStatus(to), body, "+15550000000", time.monotonic() + 60, SMS_RETRIES, SMS_BACKOFF)
+        for to in recipients
+    ]
+    serial_elapsed = time.perf_counter() - start
+
+    fanout_client = FakeTwilioClient(latency, failure_rate, invalid_numbers={recipients[-1]}, seed=seed)
+    result = send_fanout(fanout_client, body, "+15550000000", recipients)
+
+    print(f"⏱️ SMS fan-out: {contacts} contacts, {latency * 1000:.0f} ms per send, {failure_rate:.0%} transient failures")
+    print(f"  serial:     {serial_elapsed:5.2f}s  ({sum(s.delivered for s in serial_statuses)}/{contacts} sent)")
+    print(f"  concurrent: {result.elapsed:5.2f}s  ({len(result.sent)}/{contacts} sent, last number marked invalid)")
+    for status in result.statuses:
+        print(f"    {status.to}: {status.state} after {status.attempts} attempt(s)" + (f" - {status.error}" if status.error else ""))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark SMS fan-out against a local Twilio stand-in")
+    parser.add_argument("--contacts", type=int, default=5, help="Number of recipients")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Simulated Twilio API latency per send")
+    parser.add_argument("--failure-rate", type=float, default=0.2, help="Chance of a transient 503 per send")
+    args = parser.parse_args()
+    benchmark_fanout(args.contacts, args.latency_ms / 1000, args.failure_rate)
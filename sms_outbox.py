@@ -0,0 +1,448 @@
+"""
+Durable outbox for outgoing SMS.
+
+Before this, a Twilio or network failure meant the alert was printed and
+lost. Now every outgoing text is first committed to a local SQLite database
+in WAL mode (SMS_OUTBOX_DB). The workflow returns as soon as that commit is
+on disk. A background sender then drains the outbox: it claims due records
+in batches, sends each batch concurrently on the SMS fan-out pool and records
+the outcome. Transient failures go back into the outbox with exponential
+backoff. Permanent failures, or running out of SMS_OUTBOX_MAX_ATTEMPTS, mark
+the record failed. A read timeout or aborted connection leaves it unknown
+whether Twilio accepted the text: SOS records ("sos", "sos_update") are
+retried anyway, since a repeated alert beats a missing one, while other
+messages are marked failed rather than risk sending them twice.
+
+Every record has an idempotency key (for an alert: event id, alert kind and
+recipient). Enqueueing the same key twice is a no-op, and a record marked
+sent is never sent again. A sender claims records atomically and stamps them
+with its id and a lease of SMS_OUTBOX_CLAIM_TIMEOUT seconds, so several
+processes can share one outbox without sending the same record twice.
+Records whose claim expired, or whose claiming process has died, are sent
+again. For SOS records that is at-least-once delivery: a crash or an
+ambiguous failure after Twilio accepted a text can repeat that one text,
+which is the better failure for an SOS.
+
+At exit the sender keeps going for up to SMS_OUTBOX_DRAIN_TIMEOUT seconds.
+Anything still queued after that is sent by the next process that opens the
+outbox.
+
+Usage:
+    python sms_outbox.py status
+    python sms_outbox.py drain
+    python sms_outbox.py benchmark [--contacts 5] [--latency-ms 400]
+"""
+
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from event_log import get_event_log, log_event
+from sms_fanout import DeliveryStatus, send_batch
+
+load_dotenv()
+
+SMS_OUTBOX_DB = os.getenv("SMS_OUTBOX_DB", "sms_outbox.db")
+SMS_OUTBOX_BATCH = 16
+SMS_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SMS_OUTBOX_MAX_ATTEMPTS", "8"))
+SMS_OUTBOX_DRAIN_TIMEOUT = float(os.getenv("SMS_OUTBOX_DRAIN_TIMEOUT", "10"))
+SMS_OUTBOX_BACKOFF = 1.0
+SMS_OUTBOX_MAX_BACKOFF = 300.0
+# Record kinds retried after an ambiguous failure (at-least-once); others are at-most-once
+AT_LEAST_ONCE_KINDS = frozenset({"sos", "sos_update"})
+# Seconds a batch's Twilio calls may take; unanswered ones count as ambiguous failures
+SMS_SEND_TIMEOUT = 10.0
+# Seconds a claimed record stays reserved for its sender; well above a batch's send time
+SMS_OUTBOX_CLAIM_TIMEOUT = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    to_number TEXT NOT NULL,
+    from_number TEXT NOT NULL,
+    body TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    sid TEXT,
+    last_error TEXT,
+    claimed_by TEXT,
+    claimed_until REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt_at);
+"""
+# Added after the first release; older databases get them on open
+CLAIM_COLUMNS = {"claimed_by": "TEXT", "claimed_until": "REAL"}
+
+
+def new_event_id():
+    """Identifier shared by every record of one alert or message"""
+    return uuid.uuid4().hex
+
+
+class OutboxReceipt:
+    """
+    Idempotency keys of records that are durably queued; truthy if any are.
+
+    Args:
+        outbox (SmsOutbox): Outbox holding the records
+        keys (list): Idempotency keys, one per recipient
+    """
+
+    def __init__(self, outbox, keys):
+        self.outbox = outbox
+        self.keys = keys
+
+    def __bool__(self):
+        return bool(self.keys)
+
+    def statuses(self):
+        return self.outbox.statuses(self.keys) if self.keys else []
+
+    def wait(self, timeout=None):
+        """Block until every record is sent or failed; returns the final statuses"""
+        return self.outbox.wait(self.keys, timeout)
+
+
+class SmsOutbox:
+    """
+    SQLite-backed outbox with a background sender.
+
+    Args:
+        path (str): Database file
+        client: Twilio client, or None to use the shared client from api_clients
+        batch_size (int): Records claimed and sent together per round
+        max_attempts (int): Attempts before a transiently failing record is marked failed
+        backoff (float): Delay before the first retry in seconds; doubles on each retry
+    """
+
+    def __init__(self, path=SMS_OUTBOX_DB, client=None, batch_size=SMS_OUTBOX_BATCH, max_attempts=SMS_OUTBOX_MAX_ATTEMPTS, backoff=SMS_OUTBOX_BACKOFF):
+        self.path = path
+        self.client = client
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # FULL: a commit is fsynced before enqueue returns
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for column, column_type in CLAIM_COLUMNS.items():
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {column_type}")
+        # Stamped on every claim; the pid lets another process tell a dead sender from a busy one
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = None
+        with self._lock:
+            self._release_dead_claims()
+
+    def _release_dead_claims(self):
+        """Expire the claims of processes that are no longer running, so their records are retried now"""
+        owners = [row[0] for row in self._db.execute("SELECT DISTINCT claimed_by FROM outbox WHERE state = 'sending'")]
+        dead = [owner for owner in owners if not _owner_alive(owner)]
+        if dead:
+            self._write_many("UPDATE outbox SET claimed_until = 0 WHERE state = 'sending' AND claimed_by IS ?", [(owner,) for owner in dead])
+
+    def enqueue(self, recipients, body, from_number, event_id=None, kind="message"):
+        """
+        Durably queue the same body for every recipient in one transaction.
+
+        Args:
+            recipients (list): Phone numbers
+            body (str): Message text
+            from_number (str): Sending Twilio number
+            event_id (str): Identifier of this alert; reusing it makes the call a no-op
+            kind (str): Record type, part of the idempotency key (e.g. "sos", "sos_update")
+
+        Returns:
+            OutboxReceipt: Keys of the queued records
+        """
+        event_id = event_id or new_event_id()
+        now = time.time()
+        keys = [f"{event_id}:{kind}:{to}" for to in recipients]
+        with self._lock:
+            # One transaction, so one fsync, for all recipients
+            self._write_many(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, kind, to_number, from_number, body, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(key, kind, to, from_number, body, now, now) for key, to in zip(keys, recipients)],
+            )
+            self._wake.notify_all()
+        return OutboxReceipt(self, keys)
+
+    def _write_many(self, statement, parameters):
+        """Run statement for every parameter tuple in a single transaction (caller holds the lock)"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.executemany(statement, parameters)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def _claim(self, now):
+        """Atomically mark due records (and expired claims) as sending by this outbox; returns them"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._db.execute(
+                "UPDATE outbox SET state = 'sending', attempts = attempts + 1, claimed_by = ?, claimed_until = ?"
+                " WHERE id IN (SELECT id FROM outbox"
+                "  WHERE (state = 'pending' AND next_attempt_at <= ?) OR (state = 'sending' AND claimed_until <= ?)"
+                "  ORDER BY id LIMIT ?)"
+                " RETURNING id, to_number, from_number, body, attempts, kind",
+                (self.owner, now + SMS_OUTBOX_CLAIM_TIMEOUT, now, now, self.batch_size),
+            ).fetchall()
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return sorted(rows)
+
+    def _next_due(self):
+        row = self._db.execute(
+            "SELECT MIN(CASE state WHEN 'pending' THEN next_attempt_at ELSE claimed_until END)"
+            " FROM outbox WHERE state IN ('pending', 'sending')"
+        ).fetchone()
+        return row[0]
+
+    def _send_batch(self, rows):
+        client = self.client
+        if client is None:
+            from api_clients import get_twilio_client
+
+            client = get_twilio_client()
+        # The outbox retries with its own backoff, so each claim is one attempt
+        result = send_batch(client, [(row[1], row[3], row[2]) for row in rows], deadline=SMS_SEND_TIMEOUT, retries=0)
+        return list(zip(rows, result.statuses))
+
+    def _record(self, results):
+        now = time.time()
+        updates = []
+        for (record_id, to, _, _, attempts, kind), status in results:
+            retryable = status.transient or (status.ambiguous and kind in AT_LEAST_ONCE_KINDS)
+            if status.delivered:
+                updates.append(("sent", now, now, status.sid, None, record_id))
+                log_event("sms_sent", to=to, sid=status.sid, attempts=attempts)
+                print(f"✅ Outbox: sent to {to}")
+            elif retryable and attempts < self.max_attempts:
+                delay = min(SMS_OUTBOX_MAX_BACKOFF, self.backoff * 2 ** (attempts - 1))
+                updates.append(("pending", now + delay, None, None, status.error, record_id))
+                print(f"🔁 Outbox: send to {to} failed ({status.error}); retrying in {delay:.1f}s")
+            else:
+                updates.append(("failed", now, None, None, status.error, record_id))
+                log_event("sms_failed", to=to, error=status.error, attempts=attempts)
+                print(f"❌ Outbox: giving up on {to} after {attempts} attempt(s): {status.error}")
+        with self._lock:
+            # A failure is only recorded while the claim is still ours; a success always is
+            self._write_many(
+                "UPDATE outbox SET state = ?1, next_attempt_at = ?2, sent_at = ?3, sid = ?4, last_error = ?5,"
+                " claimed_by = NULL, claimed_until = NULL"
+                " WHERE id = ?6 AND state = 'sending' AND (claimed_by = ?7 OR ?1 = 'sent')",
+                [update + (self.owner,) for update in updates],
+            )
+            self._wake.notify_all()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    now = time.time()
+                    rows = self._claim(now)
+                    if rows:
+                        break
+                    next_due = self._next_due()
+                    self._wake.wait(None if next_due is None else max(0.01, next_due - now))
+                if self._closed:
+                    return
+            try:
+                results = self._send_batch(rows)
+            except Exception as e:
+                # No client (e.g. missing credentials): every claimed record counts as a transient failure
+                results = [(row, _failed_status(row[1], e)) for row in rows]
+            self._record(results)
+
+    def start(self):
+        """Start the background sender (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sms-outbox", daemon=True)
+                self._thread.start()
+        return self
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE state IN ('pending', 'sending')").fetchone()[0]
+
+    def statuses(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT idempotency_key, to_number, state, attempts, sid, last_error FROM outbox"
+                f" WHERE idempotency_key IN ({placeholders})",
+                keys,
+            ).fetchall()
+        by_key = {row[0]: row for row in rows}
+        return [
+            {"to": row[1], "state": row[2], "attempts": row[3], "sid": row[4], "error": row[5]}
+            for row in (by_key[key] for key in keys if key in by_key)
+        ]
+
+    def wait(self, keys=None, timeout=None):
+        """Block until the given records (default: all) are sent or failed; returns their statuses"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                if keys:
+                    placeholders = ",".join("?" * len(keys))
+                    query = f"SELECT COUNT(*) FROM outbox WHERE state IN ('pending', 'sending') AND idempotency_key IN ({placeholders})"
+                    open_records = self._db.execute(query, keys).fetchone()[0]
+                else:
+                    open_records = self._db.execute("SELECT COUNT(*) FROM outbox WHERE state IN ('pending', 'sending')").fetchone()[0]
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not open_records or (remaining is not None and remaining <= 0):
+                    break
+                self._wake.wait(remaining)
+        return self.statuses(keys) if keys else []
+
+    def stats(self):
+        with self._lock:
+            return _count_states(self._db)
+
+    def close(self, timeout=SMS_OUTBOX_DRAIN_TIMEOUT):
+        """Give the sender up to timeout seconds to drain, then stop it; returns True if drained"""
+        if self._thread is not None and self._thread.is_alive():
+            self.wait(timeout=timeout)
+        drained = self.pending() == 0
+        with self._lock:
+            self._closed = True
+            self._wake.notify_all()
+        return drained
+
+
+def _count_states(db):
+    counts = dict(db.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+    return {state: counts.get(state, 0) for state in ("pending", "sending", "sent", "failed")}
+
+
+def read_stats(path=SMS_OUTBOX_DB):
+    """Record counts by state, read without changing (or creating) the database"""
+    if not os.path.exists(path):
+        return {}
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return _count_states(db)
+    finally:
+        db.close()
+
+
+def _owner_alive(owner):
+    match = re.match(r"(\d+)-", owner or "")
+    if match is None:
+        return False
+    pid = int(match.group(1))
+    if pid == os.getpid():
+        # Another outbox in this process (e.g. an earlier instance); its lease decides
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
+
+
+def _failed_status(to, error):
+    status = DeliveryStatus(to)
+    status.state = "failed"
+    status.error = str(error)
+    status.transient = True
+    return status
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Shared outbox with its sender running; drained (within a timeout) at exit"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            # atexit runs handlers in reverse, so the event log is flushed after the drain logs its sends
+            get_event_log()
+            _outbox = SmsOutbox().start()
+            atexit.register(_drain_on_exit)
+        return _outbox
+
+
+def _drain_on_exit():
+    pending = _outbox.pending() if _outbox is not None else 0
+    if pending:
+        print(f"📤 Sending {pending} queued SMS before exit...")
+    if _outbox is not None and not _outbox.close():
+        print(f"📤 {_outbox.pending()} SMS still queued; they will be sent on the next start")
+
+
+def benchmark_outbox(contacts=5, latency=0.4, failure_rate=0.2):
+    """Time to durable enqueue vs time to delivery, on a temporary outbox and the local Twilio stand-in"""
+    import tempfile
+
+    from sms_fanout import FakeTwilioClient
+
+    recipients = [f"+1555010{index:04d}" for index in range(contacts)]
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeTwilioClient(latency, failure_rate, seed=7)
+        outbox = SmsOutbox(os.path.join(directory, "outbox.db"), client=client, backoff=0.1).start()
+
+        start = time.perf_counter()
+        receipt = outbox.enqueue(recipients, "🚨 EMERGENCY SOS 🚨 (outbox benchmark)", "+15550000000", kind="sos")
+        durable = time.perf_counter() - start
+        again = outbox.enqueue(recipients, "duplicate", "+15550000000", event_id=receipt.keys[0].split(":")[0], kind="sos")
+        statuses = receipt.wait(timeout=30)
+        delivered = time.perf_counter() - start
+        outbox.close(timeout=0)
+
+    print(f"⏱️ SMS outbox: {contacts} contacts, {latency * 1000:.0f} ms per send, {failure_rate:.0%} transient failures")
+    print(f"  enqueue (durable, workflow returns): {durable * 1000:7.2f} ms")
+    print(f"  all recipients settled:              {delivered * 1000:7.2f} ms")
+    print(f"  duplicate enqueue ignored: {len(client.sent) == sum(s['state'] == 'sent' for s in statuses)} ({len(again.keys)} keys reused)")
+    for status in statuses:
+        print(f"    {status['to']}: {status['state']} after {status['attempts']} attempt(s)")
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Inspect the SMS outbox or benchmark it against a local Twilio stand-in")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Record counts by state")
+    subparsers.add_parser("drain", help="Send everything queued, then exit")
+    benchmark_parser = subparsers.add_parser("benchmark", help="Enqueue vs delivery latency")
+    benchmark_parser.add_argument("--contacts", type=int, default=5)
+    benchmark_parser.add_argument("--latency-ms", type=float, default=400)
+    benchmark_parser.add_argument("--failure-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(read_stats()))
+    elif args.command == "drain":
+        get_outbox()
+    else:
+        benchmark_outbox(args.contacts, args.latency_ms / 1000, args.failure_rate)
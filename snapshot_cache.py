@@ -0,0 +1,154 @@
+"""
+Perceptual-hash cache for snapshot answers.
+
+Users often trigger SNAPSHOT again and again on the same page or equation.
+Every capture gets a fingerprint: a difference hash (dHash) of its frame
+(shrunk to (hash_size + 1) x hash_size grayscale pixels, one bit per
+"brighter than its right-hand neighbour") plus a small grayscale thumbnail.
+Frames that differ only by compression or sensor noise land within a few
+bits of each other, so the closest cached hash within max_distance is the
+candidate answer. Entries expire after a TTL and the least recently used
+are evicted past max_entries.
+
+A perceptual hash alone cannot tell "3x + 5 = 20" from "3x + 5 = 21": on a
+mostly blank page the two hash to within a bit or two. Before an answer is
+reused, the thumbnails are compared and any more than max_changed_pixels
+pixels differing by over PIXEL_DELTA gray levels makes it a miss.
+
+A reused answer is the exact same text, so its sentences also hit the TTS
+audio cache and play without synthesis.
+
+Tune with SNAPSHOT_CACHE_DISTANCE, SNAPSHOT_CACHE_MAX_CHANGED,
+SNAPSHOT_CACHE_TTL and SNAPSHOT_CACHE_SIZE; SNAPSHOT_CACHE_TTL=0 disables
+the cache.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+SNAPSHOT_HASH_SIZE = 16
+THUMBNAIL_SIZE = (160, 90)
+PIXEL_DELTA = 24
+SNAPSHOT_CACHE_DISTANCE = int(os.getenv("SNAPSHOT_CACHE_DISTANCE", "8"))
+SNAPSHOT_CACHE_MAX_CHANGED = int(os.getenv("SNAPSHOT_CACHE_MAX_CHANGED", "2"))
+SNAPSHOT_CACHE_TTL = float(os.getenv("SNAPSHOT_CACHE_TTL", "120"))
+SNAPSHOT_CACHE_SIZE = int(os.getenv("SNAPSHOT_CACHE_SIZE", "64"))
+
+
+def dhash(frame, hash_size=SNAPSHOT_HASH_SIZE):
+    """Difference hash of a BGR (or grayscale) frame as a Python int of hash_size**2 bits"""
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(hash_a, hash_b):
+    return (hash_a ^ hash_b).bit_count()
+
+
+class ImageFingerprint:
+    """dHash for fast candidate search plus a thumbnail for verification"""
+
+    def __init__(self, image_hash, thumbnail):
+        self.hash = image_hash
+        self.thumbnail = thumbnail
+
+    def changed_pixels(self, other):
+        """Thumbnail pixels that differ by more than PIXEL_DELTA gray levels"""
+        diff = np.abs(self.thumbnail.astype(np.int16) - other.thumbnail.astype(np.int16))
+        return int(np.count_nonzero(diff > PIXEL_DELTA))
+
+
+def fingerprint(frame, hash_size=SNAPSHOT_HASH_SIZE):
+    """Fingerprint a BGR frame (about 1 ms for 720p)"""
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    thumbnail = cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    # The hash is taken from the thumbnail, which is already noise-averaged
+    return ImageFingerprint(dhash(thumbnail, hash_size), thumbnail)
+
+
+class SnapshotCache:
+    """
+    LRU + TTL cache of answers keyed by image fingerprint.
+
+    Args:
+        max_distance (int): Largest dHash Hamming distance considered as a candidate
+        max_changed_pixels (int): Most thumbnail pixels allowed to differ for a hit
+        ttl (float): Seconds an answer stays valid (0 disables the cache)
+        max_entries (int): Least recently used answers are evicted past this size
+    """
+
+    def __init__(
+        self,
+        max_distance=SNAPSHOT_CACHE_DISTANCE,
+        max_changed_pixels=SNAPSHOT_CACHE_MAX_CHANGED,
+        ttl=SNAPSHOT_CACHE_TTL,
+        max_entries=SNAPSHOT_CACHE_SIZE,
+    ):
+        self.max_distance = max_distance
+        self.max_changed_pixels = max_changed_pixels
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        for key in [key for key, (_, _, stored_at) in self._entries.items() if now - stored_at > self.ttl]:
+            del self._entries[key]
+
+    def get(self, image_fingerprint, now=None):
+        """Return the cached answer for a verified near-identical image, or None"""
+        if image_fingerprint is None or self.ttl <= 0:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            candidates = sorted(
+                (hamming(key, image_fingerprint.hash), key)
+                for key in self._entries
+            )
+            for distance, key in candidates:
+                if distance > self.max_distance:
+                    break
+                answer, stored_fingerprint, _ = self._entries[key]
+                if stored_fingerprint.changed_pixels(image_fingerprint) <= self.max_changed_pixels:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+            return None
+
+    def put(self, image_fingerprint, answer, now=None):
+        if image_fingerprint is None or self.ttl <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[image_fingerprint.hash] = (answer, image_fingerprint, now)
+            self._entries.move_to_end(image_fingerprint.hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
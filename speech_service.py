@@ -0,0 +1,220 @@
+"""
+Asynchronous speech service.
+
+Workflows hand text to speak_async() and carry on: a single background
+worker speaks queued utterances one at a time, highest priority first and in
+submission order within a priority. Each call returns a
+concurrent.futures.Future that resolves when the utterance has been spoken
+(or is cancelled if it gets preempted).
+
+Emergency utterances preempt everything: the current playback is
+interrupted and lower-priority utterances still in the queue are cancelled.
+Pending speech is drained (up to SPEECH_DRAIN_TIMEOUT seconds) when the
+process exits, so a short script still finishes what it queued.
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import audio_player
+
+PRIORITY_EMERGENCY = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+SPEECH_DRAIN_TIMEOUT = float(os.getenv("SPEECH_DRAIN_TIMEOUT", "30"))
+
+
+class Utterance:
+    """One queued piece of speech"""
+
+    def __init__(self, text, priority, sentences, voice_id):
+        self.text = text
+        self.priority = priority
+        self.sentences = sentences
+        self.voice_id = voice_id
+        self.future = Future()
+        self.cancel = threading.Event()
+
+
+class SpeechService:
+    """
+    Background worker that speaks queued utterances by priority.
+
+    Args:
+        speak (callable): speak(text, voice_id, cancel) for single phrases
+        speak_sentences (callable): Same signature, for long multi-sentence text
+    """
+
+    def __init__(self, speak, speak_sentences=None):
+        self._speak = speak
+        self._speak_sentences = speak_sentences or speak
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._current = None
+        # Most urgent preemption that found no current utterance; applies to
+        # one the worker has dequeued but not yet published as current
+        self._missed_preempt = float("inf")
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="speech-service", daemon=True)
+        self._worker.start()
+
+    def submit(self, text, priority=PRIORITY_NORMAL, sentences=False, voice_id=None, preempt=None):
+        """
+        Queue text to be spoken and return a Future for its completion.
+
+        Args:
+            text (str): Text to speak
+            priority (int): Lower is more urgent (PRIORITY_EMERGENCY, PRIORITY_NORMAL, PRIORITY_LOW)
+            sentences (bool): Speak with sentence-pipelined synthesis (long text)
+            voice_id (str): ElevenLabs voice ID (None for the default voice)
+            preempt (bool): Interrupt less urgent speech; defaults to True for emergency priority
+        """
+        utterance = Utterance(text, priority, sentences, voice_id)
+        if preempt is None:
+            preempt = priority <= PRIORITY_EMERGENCY
+
+        with self._lock:
+            if self._closed:
+                utterance.future.cancel()
+                return utterance.future
+            self._pending += 1
+            if preempt:
+                self._preempt_locked(priority)
+            self._queue.put((priority, next(self._order), utterance))
+        return utterance.future
+
+    def _preempt_locked(self, priority):
+        """Cancel queued utterances and interrupt the current one if less urgent than priority"""
+        kept = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[2].priority > priority:
+                item[2].future.cancel()
+                self._pending -= 1
+            else:
+                kept.append(item)
+        for item in kept:
+            self._queue.put(item)
+        self._idle.notify_all()
+
+        current = self._current
+        if current is None:
+            self._missed_preempt = min(self._missed_preempt, priority)
+        elif current.priority > priority:
+            current.cancel.set()
+            # Only this service's playback; other audio keeps playing
+            audio_player.stop_all(thread=self._worker)
+            print(f"⏹️ Preempted speech: {current.text[:40]}...")
+
+    def _run(self):
+        while True:
+            _, _, utterance = self._queue.get()
+            if utterance is None:
+                return
+            with self._lock:
+                # A preemption between get() and here saw no current utterance
+                missed, self._missed_preempt = self._missed_preempt, float("inf")
+                if utterance.priority > missed:
+                    utterance.future.cancel()
+                if not utterance.future.set_running_or_notify_cancel():
+                    # Cancelled by the caller or a preemption while queued
+                    self._pending -= 1
+                    self._idle.notify_all()
+                    continue
+                self._current = utterance
+            try:
+                speak = self._speak_sentences if utterance.sentences else self._speak
+                kwargs = {"voice_id": utterance.voice_id} if utterance.voice_id else {}
+                speak(utterance.text, cancel=utterance.cancel, **kwargs)
+                utterance.future.set_result(not utterance.cancel.is_set())
+            except BaseException as e:
+                utterance.future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._current = None
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+    @property
+    def pending(self):
+        """Utterances queued or currently being spoken"""
+        with self._lock:
+            return self._pending
+
+    def drain(self, timeout=SPEECH_DRAIN_TIMEOUT):
+        """Wait until everything queued has been spoken; return False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=SPEECH_DRAIN_TIMEOUT):
+        """Drain pending speech, then stop the worker"""
+        drained = self.drain(timeout)
+        with self._lock:
+            self._closed = True
+        if not drained:
+            self.interrupt()
+        # Sorts after every real utterance; the worker exits when it reaches it
+        self._queue.put((float("inf"), next(self._order), None))
+        return drained
+
+    def interrupt(self):
+        """Stop the current utterance and cancel everything queued"""
+        with self._lock:
+            self._preempt_locked(float("-inf"))
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_speech_service():
+    """Return the process-wide speech service, starting it on first use"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            from text_to_speech import speak_sentences, speak_text
+
+            _service = SpeechService(speak_text, speak_sentences)
+            atexit.register(_drain_on_exit)
+        return _service
+
+
+def _drain_on_exit():
+    if _service is not None and _service.pending:
+        print(f"🔊 Finishing {_service.pending} queued utterance(s) before exit...")
+        if not _service.close():
+            print("⏹️ Speech drain timed out; remaining speech dropped")
+
+
+def speak_async(text, priority=PRIORITY_NORMAL, sentences=False, voice_id=None, preempt=None):
+    """
+    Speak text in the background without blocking the caller.
+
+    Returns:
+        concurrent.futures.Future: Resolves to True once spoken, False if interrupted;
+        cancelled if preempted while still queued
+    """
+    return get_speech_service().submit(text, priority, sentences, voice_id, preempt)
+
+
+def speak_emergency(text, sentences=False):
+    """Speak text immediately, interrupting and discarding any less urgent speech"""
+    return speak_async(text, PRIORITY_EMERGENCY, sentences, preempt=True)
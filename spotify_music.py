@@ -2,7 +2,7 @@ from dotenv import load_dotenv
 import os
 import base64
 import json
-from requests import post, get
+from http_pool import post, get
 
 load_dotenv()
 
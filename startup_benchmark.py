@@ -0,0 +1,93 @@
+"""
+Startup benchmark for the orchestrator.
+
+Measures, in fresh interpreters:
+- the `python -X importtime` profile of `import main_orchestrator`, with the
+  slowest modules by self time
+- cold start to first action for each workflow: interpreter start, importing
+  the orchestrator and resolving that one workflow (which imports its module
+  and SDKs), compared with loading every workflow up front
+
+Usage:
+    python startup_benchmark.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from main_orchestrator import WORKFLOWS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_profile(module="main_orchestrator"):
+    """Return [(self_us, cumulative_us, name)] from python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def cold_start(workflow_names, runs):
+    """Median seconds from interpreter launch to the workflows being callable"""
+    code = (
+        "import main_orchestrator as m\n"
+        f"for name in {list(workflow_names)!r}:\n"
+        "    m.resolve_workflow(name)\n"
+    )
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(elapsed)
+    return statistics.median(timings), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure orchestrator startup cost")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    rows = import_profile()
+    total_ms = max(cumulative for _, cumulative, _ in rows) / 1000
+    print(f"⏱️ import main_orchestrator: {total_ms:.1f} ms across {len(rows)} modules")
+    print(f"  {'self ms':>8} {'cum ms':>8}  module")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[: args.top]:
+        print(f"  {self_us / 1000:8.1f} {cumulative_us / 1000:8.1f}  {name.strip()}")
+
+    baseline, error = cold_start([], args.runs)
+    print(f"\n⏱️ Cold start to first action (median of {args.runs} runs)")
+    if baseline is None:
+        print(f"  {'orchestrator only':<20} {'failed':>8}     ({error})")
+    else:
+        print(f"  {'orchestrator only':<20} {baseline * 1000:8.0f} ms")
+    for name in [*WORKFLOWS, "ALL"]:
+        names = list(WORKFLOWS) if name == "ALL" else [name]
+        median, error = cold_start(names, args.runs)
+        if median is None:
+            print(f"  {name:<20} {'failed':>8}     ({error})")
+        else:
+            print(f"  {name:<20} {median * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
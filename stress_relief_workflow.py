@@ -5,21 +5,46 @@ import sys
 from pathlib import Path
 
 # Direct import from root level
-from text_to_speech import speak_text
+from event_log import log_event
+from speech_service import speak_async
+
+ACKNOWLEDGE_TEXT = "I've detected that you might be feeling stressed. Let me help you relax."
+
+# List of calming activities/sounds that could be integrated
+CALMING_OPTIONS = [
+    "Playing your favorite calm playlist",
+    "Starting guided breathing exercise", 
+    "Playing nature sounds",
+    "Starting meditation session",
+    "Playing lo-fi music"
+]
+
+BREATHING_TEXT = (
+    "Let's do a quick breathing exercise. "
+    "Breathe in slowly for 4 counts. "
+    "Hold for 4 counts. "
+    "Breathe out slowly for 6 counts. "
+    "Repeat this cycle 3 times."
+)
+
+AFFIRMATIONS = [
+    "You are strong and capable of handling whatever comes your way.",
+    "This feeling is temporary. You have overcome challenges before and you will again.",
+    "Take it one breath at a time. You've got this.",
+    "You are exactly where you need to be right now.",
+    "Your mental health matters. It's okay to take a moment for yourself."
+]
+
+# Fixed phrases spoken by this workflow, pre-warmed in the TTS cache at startup.
+# PROMPTS are spoken whole; SENTENCE_PROMPTS go through speak_sentences and are
+# cached per sentence
+PROMPTS = [ACKNOWLEDGE_TEXT, *CALMING_OPTIONS, *AFFIRMATIONS]
+SENTENCE_PROMPTS = [BREATHING_TEXT]
 
 def play_calming_music():
     """Play calming music/sounds (placeholder for music integration)"""
     
-    # List of calming activities/sounds that could be integrated
-    calming_options = [
-        "Playing your favorite calm playlist",
-        "Starting guided breathing exercise", 
-        "Playing nature sounds",
-        "Starting meditation session",
-        "Playing lo-fi music"
-    ]
-    
-    selected = random.choice(calming_options)
+    selected = random.choice(CALMING_OPTIONS)
     print(f"🎵 {selected}...")
     
     # Placeholder for actual music integration
@@ -35,55 +60,39 @@ def play_calming_music():
 def breathing_exercise():
     """Guide user through breathing exercise"""
     
-    breathing_text = (
-        "Let's do a quick breathing exercise. "
-        "Breathe in slowly for 4 counts. "
-        "Hold for 4 counts. "
-        "Breathe out slowly for 6 counts. "
-        "Repeat this cycle 3 times."
-    )
-    
     print("🫁 Starting breathing exercise...")
-    speak_text(breathing_text)
+    speak_async(BREATHING_TEXT, sentences=True)
     
     return "breathing_exercise"
 
 def stress_relief_workflow():
-    """Complete stress relief workflow: music + breathing + positive affirmations"""
+    """Complete stress relief workflow: music + breathing + positive affirmations
+    
+    Each step is queued on the speech service, which speaks them in order
+    while the workflow returns right away.
+    """
     
     print("🧘‍♀️ STRESS RELIEF WORKFLOW ACTIVATED 🧘‍♀️")
     
     # Step 1: Acknowledge stress detection
-    acknowledge_text = "I've detected that you might be feeling stressed. Let me help you relax."
     print("💙 Acknowledging stress...")
-    speak_text(acknowledge_text)
+    speak_async(ACKNOWLEDGE_TEXT)
     
     # Step 2: Start calming music
     music_action = play_calming_music()
-    speak_text(music_action)
+    speak_async(music_action)
     
     # Step 3: Guide breathing exercise
     breathing_exercise()
     
     # Step 4: Positive affirmation
-    affirmations = [
-        "You are strong and capable of handling whatever comes your way.",
-        "This feeling is temporary. You have overcome challenges before and you will again.",
-        "Take it one breath at a time. You've got this.",
-        "You are exactly where you need to be right now.",
-        "Your mental health matters. It's okay to take a moment for yourself."
-    ]
-    
-    affirmation = random.choice(affirmations)
+    affirmation = random.choice(AFFIRMATIONS)
     print(f"💙 Positive affirmation: {affirmation}")
-    speak_text(affirmation)
+    speak_async(affirmation)
     
-    # Step 5: Log stress relief session in organized folder
+    # Step 5: Log stress relief session
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_file = "stress_relief_log.txt"
-    
-    with open(log_file, 'a') as f:
-        f.write(f"{timestamp}: Stress relief session - {music_action}, breathing exercise, affirmation\n")
+    log_event("stress_relief_session", "STRESS_RELIEF", music=music_action, affirmation=affirmation)
     
     print("📝 Stress relief session logged")
     print("✅ Stress relief workflow complete!")
@@ -1,20 +1,21 @@
+import sys
+
 import cv2
-import numpy as np
 from mss import mss
 
-sct = mss()
+from frame_source import open_frame_source
+
 print(mss().monitors)
 
-# Target right half of extended monitor
-monitor = {"top": 140, "left": 25, "width": 400, "height": 600}
+# Target right half of extended monitor (see DEFAULT_REGION in frame_source.py),
+# or pass another source spec: synthetic, an image directory or a video file
+source_spec = sys.argv[1] if len(sys.argv) > 1 else None
 
-while True:
-    screenshot = sct.grab(monitor)
-    frame = np.array(screenshot)
-    frame = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-    cv2.imshow("Test Capture", frame)
-    print(f"Capturing at {monitor}")
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+with open_frame_source(source_spec) as source:
+    for frame in source:
+        cv2.imshow("Test Capture", frame)
+        print(f"Capturing at {getattr(source, 'region', source_spec)}")
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
 
 cv2.destroyAllWindows()
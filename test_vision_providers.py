@@ -0,0 +1,145 @@
+"""
+Tests for VisionRouter against local stub providers (no API keys needed):
+    python -m pytest test_vision_providers.py
+"""
+
+import time
+
+import pytest
+
+from vision_providers import StubVisionProvider, VisionError, VisionRouter
+
+IMAGE = b"\xff\xd8 not really a jpeg"
+PROMPT = "Describe this image."
+
+
+class RecordingStub(StubVisionProvider):
+    """Stub that remembers when each call started, relative to the router call"""
+
+    def __init__(self, name, **kwargs):
+        super().__init__(name, seed=1, **kwargs)
+        self.started = []
+
+    def _describe(self, image_bytes, prompt):
+        self.started.append(time.monotonic())
+        return super()._describe(image_bytes, prompt)
+
+
+def test_race_returns_fastest_provider():
+    slow = RecordingStub("slow", latency=0.3)
+    fast = RecordingStub("fast", latency=0.05)
+    router = VisionRouter([slow, fast], mode="race")
+
+    start = time.monotonic()
+    answer, name = router.describe(IMAGE, PROMPT)
+
+    assert (answer, name) == ("Answer from fast", "fast")
+    assert time.monotonic() - start < 0.25
+    # Both were called at once
+    assert len(slow.started) == 1 and slow.started[0] - start < 0.05
+    assert fast.stats.wins == 1 and slow.stats.wins == 0
+
+
+def test_race_skips_failing_provider():
+    broken = RecordingStub("broken", latency=0.01, failure_probability=1.0)
+    working = RecordingStub("working", latency=0.05)
+    router = VisionRouter([broken, working], mode="race")
+
+    assert router.describe(IMAGE, PROMPT) == ("Answer from working", "working")
+    assert broken.stats.errors == 1
+
+
+def test_hedge_fires_backup_only_after_delay():
+    primary = RecordingStub("primary", latency=0.5)
+    backup = RecordingStub("backup", latency=0.05)
+    router = VisionRouter([primary, backup], mode="hedge", hedge_after=0.15)
+
+    start = time.monotonic()
+    answer, name = router.describe(IMAGE, PROMPT)
+
+    assert name == "backup"
+    assert len(backup.started) == 1
+    assert backup.started[0] - start >= 0.15
+    assert time.monotonic() - start < 0.45
+
+
+def test_hedge_does_not_call_backup_when_primary_is_fast():
+    primary = RecordingStub("primary", latency=0.05)
+    backup = RecordingStub("backup", latency=0.05)
+    router = VisionRouter([primary, backup], mode="hedge", hedge_after=0.3)
+
+    assert router.describe(IMAGE, PROMPT) == ("Answer from primary", "primary")
+    time.sleep(0.35)
+    assert backup.started == []
+
+
+def test_single_uses_primary_only():
+    primary = RecordingStub("primary", latency=0.2)
+    backup = RecordingStub("backup", latency=0.01)
+    router = VisionRouter([primary, backup], mode="single")
+
+    assert router.describe(IMAGE, PROMPT) == ("Answer from primary", "primary")
+    assert backup.started == []
+
+
+def test_single_falls_through_on_failure():
+    primary = RecordingStub("primary", latency=0.01, failure_probability=1.0)
+    backup = RecordingStub("backup", latency=0.01)
+    router = VisionRouter([primary, backup], mode="single")
+
+    assert router.describe(IMAGE, PROMPT) == ("Answer from backup", "backup")
+    assert backup.started[0] >= primary.started[0]
+
+
+@pytest.mark.parametrize("mode", ["race", "hedge", "single"])
+def test_all_providers_failing_raises_vision_error(mode):
+    providers = [
+        RecordingStub("a", latency=0.01, failure_probability=1.0),
+        RecordingStub("b", latency=0.01, failure_probability=1.0),
+    ]
+    router = VisionRouter(providers, mode=mode, hedge_after=0.05)
+
+    with pytest.raises(VisionError) as raised:
+        router.describe(IMAGE, PROMPT)
+    assert "a: a stub failure" in str(raised.value)
+    assert "b: b stub failure" in str(raised.value)
+
+
+def test_provider_timeout_raises_vision_error():
+    router = VisionRouter([RecordingStub("stuck", latency=1.0, timeout=0.1)], mode="single")
+
+    start = time.monotonic()
+    with pytest.raises(VisionError, match="stuck: timed out"):
+        router.describe(IMAGE, PROMPT)
+    assert time.monotonic() - start < 0.5
+
+
+def test_deadline_bounds_the_whole_call():
+    router = VisionRouter([RecordingStub("slow", latency=1.0)], mode="race")
+
+    start = time.monotonic()
+    with pytest.raises(VisionError, match="timed out"):
+        router.describe(IMAGE, PROMPT, deadline=0.1)
+    assert time.monotonic() - start < 0.5
+
+
+@pytest.mark.parametrize("mode", ["race", "single"])
+def test_empty_answer_is_not_accepted(mode):
+    blank = RecordingStub("blank", latency=0.01, answer="   ")
+    working = RecordingStub("working", latency=0.05)
+    router = VisionRouter([blank, working], mode=mode)
+
+    assert router.describe(IMAGE, PROMPT) == ("Answer from working", "working")
+    assert blank.stats.wins == 0
+
+
+def test_only_empty_answers_raise_vision_error():
+    router = VisionRouter([RecordingStub("blank", latency=0.01, answer="\n")], mode="race")
+
+    with pytest.raises(VisionError, match="blank: empty answer"):
+        router.describe(IMAGE, PROMPT)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        VisionRouter([RecordingStub("a")], mode="fastest")
@@ -1,20 +1,174 @@
 import os
+import queue
+import re
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-import tempfile
-import subprocess
+import threading
+import time
+
+from api_clients import get_elevenlabs_client
+from audio_player import get_player
+from tts_cache import TTSCache, cache_key
 
 # Load environment variables
 load_dotenv()
 
-# Initialize ElevenLabs client
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-if not ELEVENLABS_API_KEY:
-    raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
+DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"
+MODEL_ID = "eleven_multilingual_v2"  # High quality multilingual model
+OUTPUT_FORMAT = "mp3_44100_128"
+# Pipe audio into the player as it arrives instead of waiting for the whole file
+STREAM_TTS = os.getenv("STREAM_TTS", "1") != "0"
+# Sentences synthesized ahead of the one currently playing
+SENTENCE_PREFETCH = 2
+# Fragments shorter than this are merged into the next sentence to keep prosody natural
+MIN_SENTENCE_CHARS = 20
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Phrase-level audio cache shared by every speak_text call
+tts_cache = TTSCache()
+
+def synthesize_to_file(text, voice_id=DEFAULT_VOICE_ID):
+    """
+    Return the path of an MP3 file for text, synthesizing it only on a cache miss
+
+    Audio is cached on disk keyed by (text, voice_id, model_id, output_format),
+    so repeated phrases play without a network round-trip.
+    """
+    key = cache_key(text, voice_id, MODEL_ID, OUTPUT_FORMAT)
+    cached_path = tts_cache.lookup(key)
+    if cached_path is not None:
+        return cached_path
+
+    audio_generator = get_elevenlabs_client().text_to_speech.convert(
+        text=text,
+        voice_id=voice_id,
+        model_id=MODEL_ID,
+        output_format=OUTPUT_FORMAT,
+    )
+    return tts_cache.put(key, b"".join(audio_generator))
+
+def _stops_prewarm(error):
+    """Errors that would fail every remaining phrase too: a missing key, bad auth or no network"""
+    if isinstance(error, (ValueError, ConnectionError)):
+        return True
+    if getattr(error, "status_code", None) in (401, 403):
+        return True
+    # httpx (used by the ElevenLabs SDK) and requests connection failures
+    return type(error).__name__ in ("ConnectError", "ConnectTimeout", "ConnectionError")
+
+def prewarm_tts_cache(phrases, voice_id=DEFAULT_VOICE_ID, background=True, sentences=False):
+    """
+    Synthesize known fixed phrases ahead of time so they play instantly later
+
+    The cache is keyed by the exact text played, so phrases must be warmed the
+    way they will be spoken: whole for speak_text, sentence by sentence for
+    speak_sentences.
+
+    Args:
+        phrases (iterable): Texts to cache
+        voice_id (str): Voice the phrases will be spoken with
+        background (bool): Warm in a daemon thread instead of blocking the caller
+        sentences (bool): The phrases are spoken with speak_sentences; cache each sentence
+    """
+    def warm():
+        for phrase in phrases:
+            for text in (split_sentences(phrase) if sentences else [phrase]):
+                try:
+                    synthesize_to_file(text, voice_id)
+                except Exception as e:
+                    print(f"❌ Could not pre-warm TTS cache for '{text[:30]}...': {e}")
+                    if _stops_prewarm(e):
+                        return
+        print(f"🔊 TTS cache warm: {tts_cache.stats()}")
+
+    if background:
+        thread = threading.Thread(target=warm, name="tts-prewarm", daemon=True)
+        thread.start()
+        return thread
+    warm()
+    return None
+
+def stream_to_player(text, voice_id=DEFAULT_VOICE_ID, player=None):
+    """
+    Synthesize text with the ElevenLabs streaming endpoint and play chunks as they arrive
+
+    The chunks are also collected and stored in the TTS cache once the stream
+    completes, so the next request for the same phrase plays from disk.
+
+    Returns:
+        float: Seconds from the request to the first audio chunk reaching the player
+    """
+    player = player or get_player()
+    key = cache_key(text, voice_id, MODEL_ID, OUTPUT_FORMAT)
+    start = time.perf_counter()
+    first_chunk_latency = None
+    chunks = []
+
+    playback = player.open_stream()
+    try:
+        for chunk in get_elevenlabs_client().text_to_speech.stream(
+            text=text,
+            voice_id=voice_id,
+            model_id=MODEL_ID,
+            output_format=OUTPUT_FORMAT,
+        ):
+            if not chunk:
+                continue
+            if first_chunk_latency is None:
+                first_chunk_latency = time.perf_counter() - start
+                print(f"⏱️ First audio after {first_chunk_latency * 1000:.0f} ms")
+            chunks.append(chunk)
+            playback.write(chunk)
+    except BaseException:
+        playback.stop()
+        raise
+    playback.finish()
+
+    tts_cache.put(key, b"".join(chunks))
+    return first_chunk_latency
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Split text into sentences (and lines), merging fragments shorter than min_chars forward"""
+    sentences = []
+    pending = ""
+    for part in SENTENCE_BOUNDARY.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+def play_text(text, voice_id=DEFAULT_VOICE_ID, player=None):
+    """
+    Play one utterance, choosing the fastest available path
+
+    Cached phrases play straight from disk. Otherwise, if the local player can
+    read from stdin (mpv, ffplay, mpg123), audio is streamed into it chunk by
+    chunk; with a file-only player (afplay) the whole file is synthesized first.
+    """
+    player = player or get_player()
+    cached_path = tts_cache.lookup(cache_key(text, voice_id, MODEL_ID, OUTPUT_FORMAT))
+    if cached_path is not None:
+        player.play_file(cached_path).wait()
+    elif STREAM_TTS and player.supports_streaming:
+        stream_to_player(text, voice_id, player)
+    else:
+        player.play_file(synthesize_to_file(text, voice_id)).wait()
 
-client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+def speak_fallback(text):
+    """Speak with the macOS built-in voice when ElevenLabs or the player fails"""
+    print("🔄 Falling back to macOS built-in speech...")
+    clean_text = text.replace('"', '\\"').replace('`', '').replace('$', '')
+    os.system(f'say -v Alex "{clean_text}"')
 
-def speak_text(text, voice_id="21m00Tcm4TlvDq8ikWAM"):
+def speak_text(text, voice_id=DEFAULT_VOICE_ID, cancel=None):
     """
     Convert text to speech using ElevenLabs API and play it immediately
     
@@ -26,46 +180,108 @@ def speak_text(text, voice_id="21m00Tcm4TlvDq8ikWAM"):
                        - "EXAVITQu4vr4xnSDxMaL": Sarah (young female voice)
                        - "29vD33N1CtxCmqQRPOHJ": Drew (male voice)
                        - "CYw3kZ02Hs0563khs1Fj": Dave (male voice)
+        cancel (threading.Event): Set when playback was interrupted, so no fallback is spoken
     """
     
     print(f"🔊 Speaking with ElevenLabs: {text[:50]}...")
     
     try:
-        # Generate audio using ElevenLabs
-        audio_generator = client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",  # High quality multilingual model
-            output_format="mp3_44100_128",
-        )
-        
-        # Convert generator to bytes
-        audio_bytes = b"".join(audio_generator)
-        
-        # Save to temporary file and play
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_file_path = tmp_file.name
-        
-        # Play using macOS afplay command
-        subprocess.run(['afplay', tmp_file_path], check=True)
-        
-        # Clean up temporary file
-        os.unlink(tmp_file_path)
-        
+        play_text(text, voice_id)
+        if cancel is not None and cancel.is_set():
+            print("⏹️ Speech interrupted")
+            return
         print("✅ Speech completed successfully!")
         
     except Exception as e:
+        if cancel is not None and cancel.is_set():
+            print("⏹️ Speech interrupted")
+            return
         print(f"❌ Error with ElevenLabs TTS: {e}")
-        # Fallback to macOS built-in TTS if ElevenLabs fails
-        print("🔄 Falling back to macOS built-in speech...")
-        clean_text = text.replace('"', '\\"').replace('`', '').replace('$', '')
-        os.system(f'say -v Alex "{clean_text}"')
+        speak_fallback(text)
+
+def speak_sentences(text, voice_id=DEFAULT_VOICE_ID, prefetch=SENTENCE_PREFETCH, cancel=None):
+    """
+    Speak multi-sentence text with synthesis pipelined behind playback
+    
+    The first sentence starts right away (streamed, or from the cache). While
+    sentence N plays, a background thread synthesizes sentences N+1..N+prefetch
+    into the TTS cache, so the total spoken time approaches pure playback time
+    instead of synthesis plus playback. Sentences always play in order.
+    
+    Args:
+        text (str): The text to speak
+        voice_id (str): ElevenLabs voice ID
+        prefetch (int): Maximum number of sentences synthesized ahead of playback
+        cancel (threading.Event): Stops speaking at the next sentence boundary when set
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= 1:
+        speak_text(text, voice_id, cancel)
+        return
+    cancel = cancel or threading.Event()
+
+    print(f"🔊 Speaking {len(sentences)} sentences with ElevenLabs: {text[:50]}...")
+    start = time.perf_counter()
+    ready = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def synthesize_ahead():
+        for sentence in sentences[1:]:
+            try:
+                item = (sentence, synthesize_to_file(sentence, voice_id), None)
+            except Exception as e:
+                item = (sentence, None, e)
+            # Bounded queue: block until playback catches up, unless it was abandoned
+            while not stop.is_set() and not cancel.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set() or cancel.is_set() or item[2] is not None:
+                return
+
+    producer = threading.Thread(target=synthesize_ahead, name="tts-prefetch", daemon=True)
+    producer.start()
+
+    spoken = 0
+    try:
+        player = get_player()
+        play_text(sentences[0], voice_id, player)
+        spoken = 1
+        for _ in sentences[1:]:
+            item = None
+            while item is None and not cancel.is_set():
+                try:
+                    item = ready.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            if item is None:
+                break
+            sentence, path, error = item
+            if error is not None:
+                raise error
+            player.play_file(path).wait()
+            spoken += 1
+        if cancel.is_set():
+            print(f"⏹️ Speech interrupted after {spoken} of {len(sentences)} sentences")
+            return
+        print(f"✅ Spoke {spoken} sentences in {time.perf_counter() - start:.1f}s")
+
+    except Exception as e:
+        if cancel.is_set():
+            print("⏹️ Speech interrupted")
+            return
+        print(f"❌ Error with ElevenLabs TTS: {e}")
+        speak_fallback(" ".join(sentences[spoken:]))
+
+    finally:
+        stop.set()
 
 def get_available_voices():
     """Get list of available voices from ElevenLabs"""
     try:
-        response = client.voices.search()
+        response = get_elevenlabs_client().voices.search()
         print("🎤 Available ElevenLabs voices:")
         for voice in response.voices:
             print(f"  - {voice.name} (ID: {voice.voice_id})")
@@ -85,7 +301,7 @@ def speak_text_with_voice_name(text, voice_name="Rachel"):
     
     try:
         # Get all voices and find the one with matching name
-        response = client.voices.search()
+        response = get_elevenlabs_client().voices.search()
         voice_id = None
         
         for voice in response.voices:
@@ -0,0 +1,129 @@
+"""
+Lightweight multi-object tracking between detector runs.
+
+When the motion gate skips inference, the last detections would otherwise
+stay frozen where the object used to be. BoxTracker matches each new set of
+detections to existing tracks by IoU, keeps a smoothed constant-velocity
+estimate per track, and propagates boxes to the current time on frames where
+the detector did not run. Track IDs stay stable across frames so downstream
+consumers can count objects.
+"""
+
+import time
+
+import numpy as np
+
+
+class Track:
+    """One tracked object: last box, velocity in pixels/second, class and confidence"""
+
+    def __init__(self, track_id, box, cls, conf, now):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.cls = int(cls)
+        self.conf = float(conf)
+        self.last_update = now
+        self.hits = 1
+        self.misses = 0
+
+    def predict(self, now):
+        """Box extrapolated to time now with the constant-velocity model"""
+        return self.box + self.velocity * (now - self.last_update)
+
+    def update(self, box, cls, conf, now, smoothing):
+        box = np.asarray(box, dtype=np.float32)
+        dt = now - self.last_update
+        if dt > 0:
+            measured = (box - self.box) / dt
+            self.velocity = smoothing * self.velocity + (1 - smoothing) * measured
+        self.box = box
+        self.cls = int(cls)
+        self.conf = float(conf)
+        self.last_update = now
+        self.hits += 1
+        self.misses = 0
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+class BoxTracker:
+    """
+    IoU-matched tracker with constant-velocity propagation.
+
+    Args:
+        iou_threshold (float): Minimum IoU between a predicted track and a detection to match them
+        max_misses (int): Drop a track after this many detector runs without a match
+        smoothing (float): Weight of the previous velocity when blending in a new measurement (0-1)
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=3, smoothing=0.6):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, xyxy, conf, cls, now=None):
+        """Match a new set of detections to the tracks and return the live tracks"""
+        now = time.time() if now is None else now
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        cls = np.asarray(cls).reshape(-1).astype(int)
+
+        matched_tracks = set()
+        matched_detections = set()
+        if self.tracks and len(xyxy):
+            predicted = np.stack([track.predict(now) for track in self.tracks])
+            iou = box_iou(predicted, xyxy)
+            # Only boxes of the same class can continue a track
+            same_class = np.array([track.cls for track in self.tracks])[:, None] == cls[None, :]
+            iou[~same_class] = 0
+
+            # Greedy assignment, best overlaps first
+            for flat_index in np.argsort(iou, axis=None)[::-1]:
+                track_index, det_index = np.unravel_index(flat_index, iou.shape)
+                if iou[track_index, det_index] < self.iou_threshold:
+                    break
+                if track_index in matched_tracks or det_index in matched_detections:
+                    continue
+                self.tracks[track_index].update(
+                    xyxy[det_index], cls[det_index], conf[det_index], now, self.smoothing
+                )
+                matched_tracks.add(track_index)
+                matched_detections.add(det_index)
+
+        survivors = []
+        for index, track in enumerate(self.tracks):
+            if index not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+
+        for det_index in range(len(xyxy)):
+            if det_index not in matched_detections:
+                self.tracks.append(
+                    Track(self._next_id, xyxy[det_index], cls[det_index], conf[det_index], now)
+                )
+                self._next_id += 1
+
+        return self.visible(now)
+
+    def visible(self, now=None):
+        """Tracks matched on the latest detector run, as (track, box at time now) pairs"""
+        now = time.time() if now is None else now
+        return [(track, track.predict(now)) for track in self.tracks if track.misses == 0]
+
@@ -0,0 +1,113 @@
+"""
+On-disk cache for synthesized speech.
+
+Audio is stored content-addressed: the file name is a hash of (text,
+voice_id, model_id, output_format), so the same phrase in the same voice is
+only ever synthesized once. The cache is bounded by total size and evicts the
+least recently used files first (a hit refreshes the file's mtime).
+Files keep an .mp3 suffix so players can open them directly; speak_text
+only requests mp3 output formats.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".tts_cache")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "100"))
+
+
+def cache_key(text, voice_id, model_id, output_format):
+    payload = json.dumps([text, voice_id, model_id, output_format], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Size-bounded LRU cache of audio files.
+
+    Args:
+        directory (str): Where audio files are stored
+        max_bytes (int): Total size above which the least recently used files are evicted
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MAX_MB * 2**20)):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes = {path.name: path.stat().st_size for path in self.directory.glob("*.mp3")}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.directory / f"{key}.mp3"
+
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def lookup(self, key):
+        """Return the path of the cached audio file, or None on a miss"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                # Mark as recently used for LRU eviction
+                os.utime(path)
+            except FileNotFoundError:
+                self._sizes.pop(path.name, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return path
+
+    def get(self, key):
+        """Return cached audio bytes, or None on a miss"""
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        """Store audio bytes atomically, evict down to max_bytes and return the file path"""
+        path = self._path(key)
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+            self._sizes[path.name] = len(data)
+            self._evict()
+        return path
+
+    def __contains__(self, key):
+        return self._path(key).exists()
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        entries = []
+        for name in self._sizes:
+            try:
+                entries.append((os.stat(self.directory / name).st_mtime, name))
+            except FileNotFoundError:
+                entries.append((0, name))
+        for _, name in sorted(entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            (self.directory / name).unlink(missing_ok=True)
+            self._sizes.pop(name, None)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "files": len(self._sizes),
+            "bytes": self.total_bytes,
+        }
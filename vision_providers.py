@@ -0,0 +1,400 @@
+"""
+Vision providers with racing and hedging.
+
+The snapshot, speech and emergency workflows used to be hardwired to one
+vision API each and failed outright when it errored. Here every backend
+(Cohere command-a-vision, Gemini, local stubs) implements the same
+describe(jpeg_bytes, prompt) call, and a VisionRouter spreads a request
+across several of them:
+
+- race: call every provider at once and take the first valid answer, so a
+  slow or failing provider never sets the latency
+- hedge: call the primary provider and start the next one only if no
+  answer arrives within hedge_after seconds (by default the primary's
+  observed p95), which costs one extra request only on the slow tail
+
+Every provider has its own timeout and keeps latency stats (count, errors,
+timeouts, wins, p50/p95).
+
+Configure the default router with VISION_PROVIDERS (comma separated, in
+priority order; providers without an API key are skipped) and VISION_MODE.
+Run this module for a demo with stub providers:
+    python vision_providers.py
+"""
+
+import base64
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VISION_PROVIDERS = os.getenv("VISION_PROVIDERS", "cohere,gemini")
+VISION_MODE = os.getenv("VISION_MODE", "race")
+DEFAULT_TIMEOUT = 15.0
+DEFAULT_HEDGE_AFTER = 1.5
+# Samples needed before hedge_after follows the primary's p95
+MIN_HEDGE_SAMPLES = 20
+MODES = ("race", "hedge", "single")
+
+
+class VisionError(Exception):
+    """No provider produced a valid answer"""
+
+
+class LatencyStats:
+    """Latency samples and outcome counters for one provider"""
+
+    def __init__(self, max_samples=500):
+        self.max_samples = max_samples
+        self.samples = []
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.samples.append(seconds)
+            if len(self.samples) > self.max_samples:
+                del self.samples[0]
+
+    def record_error(self):
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def percentile(self, p):
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self):
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "wins": self.wins,
+            "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+        }
+
+
+class VisionProvider:
+    """
+    Base class for a vision backend.
+
+    Args:
+        name (str): Label used in logs and stats
+        timeout (float): Seconds to wait for this provider before giving up on it
+    """
+
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.timeout = timeout
+        self.stats = LatencyStats()
+
+    def _describe(self, image_bytes, prompt):
+        raise NotImplementedError
+
+    def describe(self, image_bytes, prompt):
+        """Answer prompt about a JPEG image, recording latency and errors"""
+        start = time.perf_counter()
+        try:
+            answer = self._describe(image_bytes, prompt)
+        except Exception:
+            self.stats.record_error()
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return answer
+
+
+class CohereVisionProvider(VisionProvider):
+    """Cohere command-a-vision through the chat API"""
+
+    def __init__(self, model="command-a-vision-07-2025", temperature=0.3, timeout=DEFAULT_TIMEOUT):
+        super().__init__("cohere", timeout)
+        self.model = model
+        self.temperature = temperature
+
+    def _describe(self, image_bytes, prompt):
+        from api_clients import get_cohere_client
+
+        data_uri = "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode("utf-8")
+        resp = get_cohere_client().chat(
+            model=self.model,
+            temperature=self.temperature,
+            messages=[{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": data_uri}},
+                ],
+            }],
+        )
+        return resp.message.content[0].text.strip()
+
+
+class GeminiVisionProvider(VisionProvider):
+    """Google Gemini generate_content with an inline JPEG"""
+
+    def __init__(self, model_name=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__("gemini", timeout)
+        self.model_name = model_name
+
+    def _describe(self, image_bytes, prompt):
+        from api_clients import GEMINI_MODEL, get_gemini_model
+
+        model = get_gemini_model(self.model_name or GEMINI_MODEL)
+        response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_bytes}])
+        return response.text.strip()
+
+
+class StubVisionProvider(VisionProvider):
+    """
+    Local stand-in with a configurable latency distribution, for demos and tests.
+
+    Args:
+        latency (float): Typical response time in seconds
+        tail_latency (float): Response time on a slow call
+        tail_probability (float): Chance that a call is slow
+        failure_probability (float): Chance that a call raises
+        answer (str): Text returned on success
+    """
+
+    def __init__(
+        self,
+        name="stub",
+        latency=0.2,
+        tail_latency=2.0,
+        tail_probability=0.0,
+        failure_probability=0.0,
+        answer=None,
+        timeout=DEFAULT_TIMEOUT,
+        seed=None,
+    ):
+        super().__init__(name, timeout)
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self.failure_probability = failure_probability
+        self.answer = answer or f"Answer from {name}"
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _describe(self, image_bytes, prompt):
+        with self._random_lock:
+            slow = self._random.random() < self.tail_probability
+            fail = self._random.random() < self.failure_probability
+            jitter = self._random.uniform(0.8, 1.2)
+        time.sleep((self.tail_latency if slow else self.latency) * jitter)
+        if fail:
+            raise RuntimeError(f"{self.name} stub failure")
+        return self.answer
+
+
+def valid_answer(answer):
+    return isinstance(answer, str) and bool(answer.strip())
+
+
+class VisionRouter:
+    """
+    Send one vision request to several providers and return the first valid answer.
+
+    Args:
+        providers (list): VisionProviders in priority order (first is the primary)
+        mode (str): "race", "hedge" or "single" (primary only, next on failure)
+        hedge_after (float): Seconds before hedging to the next provider; None
+            uses the primary's p95 once enough samples exist
+        default_hedge_after (float): Hedge delay until the primary has enough
+            samples, and the upper bound on the p95-based delay
+    """
+
+    def __init__(self, providers, mode=VISION_MODE, hedge_after=None, default_hedge_after=DEFAULT_HEDGE_AFTER):
+        if not providers:
+            raise ValueError("VisionRouter needs at least one provider")
+        if mode not in MODES:
+            raise ValueError(f"Unknown vision mode: {mode}. Available: {MODES}")
+        self.providers = list(providers)
+        self.mode = mode
+        self.hedge_after = hedge_after
+        self.default_hedge_after = default_hedge_after
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="vision")
+
+    def _hedge_delay(self):
+        if self.hedge_after is not None:
+            return self.hedge_after
+        primary = self.providers[0].stats
+        if len(primary.samples) >= MIN_HEDGE_SAMPLES:
+            # A heavy tail can pull p95 into the slow mode; never wait longer than the default
+            return min(primary.percentile(95), self.default_hedge_after)
+        return self.default_hedge_after
+
+    def describe(self, image_bytes, prompt, deadline=None):
+        """
+        Return (answer, provider_name) for a JPEG image.
+
+        Args:
+            deadline (float): Seconds the whole call may take, across every provider
+                (default: only the per-provider timeouts apply)
+
+        Raises:
+            VisionError: If every provider failed, returned nothing or timed out
+        """
+        start = time.monotonic()
+        give_up_at = start + deadline if deadline is not None else float("inf")
+        pending = {}
+        deadlines = {}
+        errors = []
+        queued = list(self.providers)
+
+        def launch(count):
+            for _ in range(count):
+                if not queued:
+                    return
+                provider = queued.pop(0)
+                future = self._pool.submit(provider.describe, image_bytes, prompt)
+                pending[future] = provider
+                deadlines[future] = min(time.monotonic() + provider.timeout, give_up_at)
+
+        launch(len(queued) if self.mode == "race" else 1)
+        next_hedge = start + self._hedge_delay() if self.mode == "hedge" else None
+
+        while pending or queued:
+            if time.monotonic() >= give_up_at:
+                errors.append(f"no answer within the {deadline:.1f}s deadline")
+                break
+            if not pending:
+                # Everything in flight failed; fall through to the next provider
+                launch(1)
+                next_hedge = time.monotonic() + self._hedge_delay() if self.mode == "hedge" else None
+                continue
+
+            now = time.monotonic()
+            wake = min(deadlines[future] for future in pending)
+            if next_hedge is not None and queued:
+                wake = min(wake, next_hedge)
+            done, _ = wait(list(pending), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = pending.pop(future)
+                deadlines.pop(future)
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+                    continue
+                if valid_answer(answer):
+                    provider.stats.record_win()
+                    return answer, provider.name
+                errors.append(f"{provider.name}: empty answer")
+
+            now = time.monotonic()
+            for future in [future for future in pending if deadlines[future] <= now]:
+                provider = pending.pop(future)
+                deadlines.pop(future)
+                provider.stats.record_timeout()
+                errors.append(f"{provider.name}: timed out after {now - start:.1f}s")
+
+            if next_hedge is not None and queued and now >= next_hedge:
+                launch(1)
+                next_hedge = now + self._hedge_delay()
+
+        raise VisionError("; ".join(errors) or "no vision providers configured")
+
+    def stats(self):
+        return {provider.name: provider.stats.summary() for provider in self.providers}
+
+
+PROVIDER_FACTORIES = {
+    "cohere": ("COHERE_API_KEY", CohereVisionProvider),
+    "gemini": ("GEMINI_API_KEY", GeminiVisionProvider),
+}
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_vision_router():
+    """Shared router over every configured provider that has an API key"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            providers = []
+            for name in (name.strip() for name in VISION_PROVIDERS.split(",") if name.strip()):
+                if name not in PROVIDER_FACTORIES:
+                    raise ValueError(f"Unknown vision provider: {name}. Available: {list(PROVIDER_FACTORIES)}")
+                variable, factory = PROVIDER_FACTORIES[name]
+                if os.getenv(variable):
+                    providers.append(factory())
+            if not providers:
+                raise VisionError("No vision provider has an API key configured")
+            _router = VisionRouter(providers, VISION_MODE)
+        return _router
+
+
+def describe_image(image_bytes, prompt, deadline=None):
+    """Describe a JPEG with the shared router; returns the answer text"""
+    answer, provider_name = get_vision_router().describe(image_bytes, prompt, deadline)
+    print(f"👁️ Vision answer from {provider_name}")
+    return answer
+
+
+def demo(requests_per_mode=200, scale=0.1):
+    """Compare single-provider, hedged and raced tail latency with stub providers"""
+
+    def providers():
+        # Primary: usually fast with a heavy tail and occasional errors; secondary: steadier
+        return [
+            StubVisionProvider("primary", latency=0.8 * scale, tail_latency=6 * scale,
+                               tail_probability=0.1, failure_probability=0.03, seed=1),
+            StubVisionProvider("secondary", latency=1.2 * scale, tail_latency=3 * scale,
+                               tail_probability=0.05, seed=2),
+        ]
+
+    print(f"🧪 Vision routing demo: {requests_per_mode} requests per mode (latencies scaled by {scale})")
+    for mode in MODES:
+        router = VisionRouter(providers(), mode=mode, default_hedge_after=DEFAULT_HEDGE_AFTER * scale)
+        latencies = []
+        failures = 0
+        for _ in range(requests_per_mode):
+            start = time.perf_counter()
+            try:
+                router.describe(b"", "describe")
+            except VisionError:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] / scale
+
+        calls = sum(provider.stats.calls for provider in router.providers)
+        print(
+            f"  {mode:<7} p50 {percentile(50):.2f}s | p95 {percentile(95):.2f}s | p99 {percentile(99):.2f}s"
+            f" | failures {failures} | provider calls/request {calls / requests_per_mode:.2f}"
+        )
+        for name, summary in router.stats().items():
+            print(f"      {name:<10} {summary}")
+
+
+if __name__ == "__main__":
+    demo()